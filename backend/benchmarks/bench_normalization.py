@@ -0,0 +1,155 @@
+"""Micro-benchmark: transcript assembly and normalization on multi-hour transcripts.
+
+Compares one normalization pass of each pipeline on synthetic auto-caption
+transcripts:
+
+- legacy: the pre-change code. String += assembly, three regex passes and
+  a word loop that only drops repeated single words
+- naive n-gram: the legacy word loop extended to look back for repeated
+  n-grams word by word. It does the same work as the new normalizer, so it
+  is the like-for-like baseline
+- new: the fetch path. Captions are joined once and run through normalize_text
+
+The first table compares single passes. The legacy pass drops only
+repeated single words, so it is a lower bound rather than an equivalent
+workload. The second table shows the separate
+request-count effect. Legacy cleaned the transcript again on every summarize
+request. Store-resolved requests now pass ``normalized=True`` and skip
+cleaning, so the new pipeline pays for one pass per fetch.
+
+    python benchmarks/bench_normalization.py [--hours 1 3 6] [--repeat 5] [--requests 3]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services.text_normalizer import normalize_text  # noqa: E402
+
+VOCABULARY = (
+    "so today we are going to talk about how neural networks learn from data and why gradient descent "
+    "works the model takes an input vector multiplies it by weights adds a bias and applies a nonlinearity "
+    "then we compare the prediction with the label compute the loss and propagate the error backwards"
+).split()
+ARTIFACTS = ["[Music]", "[Applause]", "(laughs)", "[inaudible]"]
+
+
+def make_segments(hours: float, seed: int = 0):
+    """Auto-caption-like segments: ~2.5 words/s, rolling repeats and artifacts"""
+    rng = random.Random(seed)
+    segments = []
+    previous = []
+    start = 0.0
+    while start < hours * 3600:
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(5, 10))]
+        roll = rng.random()
+        if roll < 0.2 and previous:
+            # Rolling captions repeat the tail of the previous line
+            words = previous[-rng.randint(2, 4):] + words
+        elif roll < 0.25:
+            words.insert(rng.randrange(len(words)), rng.choice(ARTIFACTS))
+        elif roll < 0.35:
+            position = rng.randrange(len(words))
+            words.insert(position, words[position])
+        segments.append({"text": " ".join(words), "start": start})
+        previous = words
+        start += len(words) / 2.5
+    return segments
+
+
+def legacy_assemble(segments):
+    full_text = ""
+    for segment in segments:
+        full_text += f"{segment['text'].strip()} "
+    return full_text.strip()
+
+
+def legacy_clean(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\[.*?\]', '', text)
+    text = re.sub(r'\(.*?\)', '', text)
+    words = text.split()
+    cleaned_words = []
+    prev_word = ""
+    for word in words:
+        if word.lower() != prev_word.lower():
+            cleaned_words.append(word)
+        prev_word = word
+    return ' '.join(cleaned_words).strip()
+
+
+def naive_ngram_pipeline(segments, max_ngram=8):
+    text = ' '.join(segment['text'] for segment in segments)
+    text = re.sub(r'\[.*?\]|\(.*?\)', ' ', text)
+    words = []
+    keys = []
+    for word in text.split():
+        words.append(word)
+        keys.append(word.lower())
+        n = 1
+        while n <= max_ngram and len(keys) >= 2 * n:
+            if keys[-n:] == keys[-2 * n:-n]:
+                del words[-n:]
+                del keys[-n:]
+                n = 1
+                continue
+            n += 1
+    return ' '.join(words)
+
+
+def legacy_pipeline(segments):
+    return legacy_clean(legacy_assemble(segments))
+
+
+def new_pipeline(segments):
+    return normalize_text(' '.join(segment['text'].strip() for segment in segments))
+
+
+def best_of(func, segments, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(segments)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 3, 6])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=3, help="Summarize requests per fetched transcript")
+    args = parser.parse_args()
+
+    rows = []
+    print("One pass")
+    print(f"{'hours':>5} {'words in':>9} {'legacy ms':>10} {'naive ms':>9} {'new ms':>7} "
+          f"{'new vs legacy':>14} {'new vs naive':>13} {'legacy out':>11} {'new out':>8}")
+    for hours in args.hours:
+        segments = make_segments(hours)
+        words = sum(len(segment["text"].split()) for segment in segments)
+        assemble_time, assembled = best_of(legacy_assemble, segments, args.repeat)
+        clean_time, _ = best_of(legacy_clean, assembled, args.repeat)
+        legacy_time, legacy_text = best_of(legacy_pipeline, segments, args.repeat)
+        naive_time, _ = best_of(naive_ngram_pipeline, segments, args.repeat)
+        new_time, new_text = best_of(new_pipeline, segments, args.repeat)
+        rows.append((hours, assemble_time, clean_time, new_time))
+        print(f"{hours:>5g} {words:>9} {legacy_time * 1000:>10.1f} {naive_time * 1000:>9.1f} {new_time * 1000:>7.1f} "
+              f"{legacy_time / new_time:>13.2f}x {naive_time / new_time:>12.2f}x "
+              f"{len(legacy_text.split()):>11} {len(new_text.split()):>8}")
+
+    print()
+    print(f"Fetch plus {args.requests} summarize requests on the same transcript")
+    print(f"{'hours':>5} {'legacy ms':>10} {'new ms':>7} {'ratio':>7}")
+    for hours, assemble_time, clean_time, new_time in rows:
+        # Legacy assembled at fetch and cleaned per request; new normalizes once at fetch
+        legacy_total = assemble_time + args.requests * clean_time
+        print(f"{hours:>5g} {legacy_total * 1000:>10.1f} {new_time * 1000:>7.1f} {legacy_total / new_time:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
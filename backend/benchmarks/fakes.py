@@ -0,0 +1,240 @@
+"""Local stand-ins for YouTube, oEmbed and Gemini used by the offline benchmarks.
+
+Every fake has configurable latency and error rate, so load tests run with
+no network access and no API keys:
+
+- FakeTranscriptApi replaces ``YouTubeTranscriptApi``. Fixture transcripts
+  are generated from the video ID, whose first six digits give the
+  duration in seconds (``fixture_video_id(3600)`` is a one-hour video).
+- youtube_transport() is an httpx transport that serves the oEmbed
+  endpoint and playlist pages (see ``fixture_playlist_id``).
+- FakeGenerativeModel replaces ``genai.GenerativeModel``. Its answers are
+  shaped to match each prompt: bullets, flashcard or quiz JSON, study
+  pack JSON or numbered translations.
+"""
+import asyncio
+import functools
+import json
+import random
+import re
+import time
+from typing import Iterator, List, Optional
+
+import httpx
+
+TOPICS = [
+    "neural networks learn weights from labelled examples by adjusting each connection",
+    "gradient descent follows the slope of the loss function towards a minimum",
+    "backpropagation applies the chain rule layer by layer to compute gradients",
+    "regularization such as dropout and weight decay reduces overfitting on small datasets",
+    "convolutional layers share kernels across the image to detect edges and textures",
+    "attention lets every token weigh every other token when building its representation",
+    "evaluation on a held out test set estimates how the model generalizes",
+    "deployment needs monitoring because input distributions drift over time",
+]
+FILLER = "so um you know like basically right okay and then".split()
+ARTIFACTS = ["[Music]", "[Applause]", "(laughs)", "[inaudible]"]
+
+# Fixture durations in seconds, from one minute to six hours
+FIXTURE_DURATIONS = {"1m": 60, "10m": 600, "1h": 3600, "3h": 3 * 3600, "6h": 6 * 3600}
+
+
+class FakeAPIError(Exception):
+    """Error carrying an HTTP-like status code, as google.api_core errors do"""
+
+    def __init__(self, message: str, code: int):
+        super().__init__(message)
+        self.code = code
+
+
+def fixture_video_id(seconds: int, variant: int = 0) -> str:
+    """11-character video ID encoding the fixture duration and a variant number"""
+    return f"{seconds:06d}{variant:05d}"
+
+
+def fixture_seconds(video_id: str) -> int:
+    return int(video_id[:6]) if video_id[:6].isdigit() else 600
+
+
+class FakeSnippet:
+    """Mirrors youtube_transcript_api's FetchedTranscriptSnippet"""
+
+    __slots__ = ("text", "start", "duration")
+
+    def __init__(self, text: str, start: float, duration: float):
+        self.text = text
+        self.start = start
+        self.duration = duration
+
+
+@functools.lru_cache(maxsize=64)
+def make_transcript(video_id: str) -> List[FakeSnippet]:
+    """Auto-caption-like segments whose topic drifts over the video.
+
+    About 2.5 words per second, with rolling repeats of the previous line,
+    caption artifacts and filler words, seeded by the video ID so each
+    variant has different content.
+    """
+    seconds = fixture_seconds(video_id)
+    rng = random.Random(video_id)
+    segments = []
+    previous: List[str] = []
+    start = 0.0
+    while start < seconds:
+        topic = TOPICS[int(start / seconds * len(TOPICS))].split()
+        words = [rng.choice(topic) if rng.random() < 0.7 else rng.choice(FILLER) for _ in range(rng.randint(5, 10))]
+        roll = rng.random()
+        if roll < 0.2 and previous:
+            words = previous[-rng.randint(2, 4):] + words
+        elif roll < 0.25:
+            words.insert(rng.randrange(len(words)), rng.choice(ARTIFACTS))
+        duration = len(words) / 2.5
+        segments.append(FakeSnippet(" ".join(words), round(start, 2), round(duration, 2)))
+        previous = words
+        start += duration
+    return segments
+
+
+class FakeLatency:
+    """Log-normal latency around a median, plus an error rate"""
+
+    def __init__(self, median: float, jitter: float = 0.3, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.median = median
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    def delay(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * self._rng.lognormvariate(0, self.jitter)
+
+    def fails(self) -> bool:
+        return self._rng.random() < self.error_rate
+
+
+class FakeTranscriptApi:
+    """Drop-in for YouTubeTranscriptApi; configure with FakeTranscriptApi.latency"""
+
+    latency = FakeLatency(0.3)
+
+    def fetch(self, video_id: str) -> List[FakeSnippet]:
+        time.sleep(self.latency.delay())
+        if self.latency.fails():
+            raise Exception("Transcripts are disabled for this video")
+        return make_transcript(video_id)
+
+
+def fixture_playlist_id(seconds: int, count: int) -> str:
+    """Playlist ID whose page lists ``count`` fixture videos of the given duration"""
+    return f"PLfixture{seconds:06d}x{count}"
+
+
+def youtube_transport(latency: FakeLatency) -> httpx.AsyncBaseTransport:
+    """httpx transport answering oEmbed and playlist page requests locally"""
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency.delay())
+        if latency.fails():
+            return httpx.Response(503, text="Service Unavailable")
+
+        if request.url.path == "/oembed":
+            video_id = request.url.params.get("url", "").rsplit("v=", 1)[-1]
+            minutes = fixture_seconds(video_id) // 60
+            return httpx.Response(200, json={
+                "title": f"Benchmark lecture ({minutes} min)",
+                "author_name": "Benchmark Channel",
+                "thumbnail_url": f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg",
+            })
+
+        match = re.fullmatch(r'PLfixture(\d{6})x(\d+)', request.url.params.get("list", ""))
+        if request.url.path == "/playlist" and match:
+            seconds, count = int(match.group(1)), int(match.group(2))
+            items = ",".join(
+                json.dumps({"videoId": fixture_video_id(seconds, variant)}, separators=(",", ":"))
+                for variant in range(1, count + 1)
+            )
+            return httpx.Response(200, text=f"<html><script>var data = [{items}];</script></html>")
+        return httpx.Response(404, text="Not Found")
+
+    return httpx.MockTransport(handle)
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel; configure with FakeGenerativeModel.latency.
+
+    Latency grows with the prompt (``seconds_per_1k_tokens`` per thousand
+    estimated input tokens) on top of the configured median. Errors carry
+    ``error_code`` (503 by default, retried by the gateway; 429 exercises
+    quota handling).
+    """
+
+    latency = FakeLatency(0.8)
+    seconds_per_1k_tokens = 0.05
+    error_code = 503
+
+    def __init__(self, model_name: str = "fake-model", **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, stream: bool = False, request_options: Optional[dict] = None):
+        delay = self.latency.delay() + len(prompt) / 4000 * self.seconds_per_1k_tokens
+        failed = self.latency.fails()
+        text = self._answer(prompt)
+        if not stream:
+            time.sleep(delay)
+            if failed:
+                raise FakeAPIError("Fake Gemini error", self.error_code)
+            return FakeResponse(text)
+        return self._stream(text, delay, failed)
+
+    def _stream(self, text: str, delay: float, failed: bool) -> Iterator[FakeResponse]:
+        lines = text.splitlines(keepends=True)
+        # Time to first token is about a third of the call
+        time.sleep(delay / 3)
+        if failed:
+            raise FakeAPIError("Fake Gemini error", self.error_code)
+        for line in lines:
+            time.sleep(delay * 2 / 3 / max(1, len(lines)))
+            yield FakeResponse(line)
+
+    def _answer(self, prompt: str) -> str:
+        if "Create study materials" in prompt:
+            return json.dumps({
+                "summary": self._points(7),
+                "flashcards": self._flashcards(self._count(prompt, r'exactly (\d+) question/answer', 10)),
+                "quiz": self._quiz(self._count(prompt, r'exactly (\d+) multiple choice', 5)),
+            })
+        if "educational flashcards" in prompt:
+            return json.dumps({"flashcards": self._flashcards(self._count(prompt, r'Create (\d+) educational', 10))})
+        if "multiple choice quiz" in prompt:
+            return json.dumps({"quiz": self._quiz(self._count(prompt, r'Create (\d+) multiple choice', 5))})
+        if "Please translate the following" in prompt:
+            numbered = re.findall(r'^\[(\d+)\]\s*(.+)$', prompt, re.MULTILINE)
+            return "\n".join(f"[{number}] (translated) {text}" for number, text in numbered)
+        count = 4 if "Below is part" in prompt else 7
+        return "\n".join(f"• {point}" for point in self._points(count))
+
+    def _count(self, prompt: str, pattern: str, default: int) -> int:
+        match = re.search(pattern, prompt)
+        return int(match.group(1)) if match else default
+
+    def _points(self, count: int) -> List[str]:
+        return [f"{TOPICS[i % len(TOPICS)].capitalize()}, which the lecture illustrates with a worked example."
+                for i in range(count)]
+
+    def _flashcards(self, count: int) -> List[dict]:
+        return [{"question": f"What does the lecture say about topic {i + 1}?",
+                 "answer": TOPICS[i % len(TOPICS)].capitalize() + ".", "category": "Concept"}
+                for i in range(count)]
+
+    def _quiz(self, count: int) -> dict:
+        return {"title": "Benchmark Quiz", "questions": [
+            {"question": f"Which statement about topic {i + 1} is correct?",
+             "options": {"A": TOPICS[i % len(TOPICS)], "B": "None of these", "C": "All of these", "D": "It depends"},
+             "correct_answer": "A", "explanation": "The lecture states it directly."}
+            for i in range(count)
+        ]}
@@ -0,0 +1,368 @@
+"""Offline load test: drives every API endpoint against local fakes.
+
+YouTubeTranscriptApi, the oEmbed endpoint and genai.GenerativeModel are
+replaced by the stand-ins in ``fakes.py`` (configurable latency and error
+rates), and the app is called in-process through httpx's ASGI transport,
+so no network access or API key is needed. Each scenario runs at every
+requested concurrency, on every fixture transcript (1 minute to 6 hours)
+where it takes one, and reports throughput, p50/p95/p99 latency and peak
+memory.
+
+By default caches stay warm between requests, as in production; --cold
+gives every request unique content (or use_cache=false) so each one does
+the full work. Gemini rate limiting is lifted by default so the app is
+measured rather than the quota; pass --gemini-rpm 15 to model the real one.
+
+    python benchmarks/load_test.py [--scenarios summarize quiz ...] [--fixtures 1m 10m 1h 3h 6h]
+                                   [--concurrency 1 8 32] [--requests 16] [--cold] [--json results.json]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx  # noqa: E402
+
+from fakes import (  # noqa: E402
+    FIXTURE_DURATIONS, FakeGenerativeModel, FakeLatency, FakeTranscriptApi,
+    fixture_playlist_id, fixture_video_id, youtube_transport,
+)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - peak RSS is not reported on Windows
+    resource = None
+
+# One timed request: (endpoint, seconds, succeeded)
+Sample = Tuple[str, float, bool]
+
+TRANSLATION_LANGUAGES = ["es", "fr", "de"]
+BATCH_VIDEOS = 3
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LoadTest:
+    """Scenarios for every endpoint, run against the in-process app"""
+
+    def __init__(self, client: httpx.AsyncClient, cold: bool):
+        self.client = client
+        self.cold = cold
+        self.fixtures: Dict[str, Dict[str, Any]] = {}
+        self._variants = itertools.count(1000)
+
+    # Operations get a fixture and a request number. Scenarios whose cost does not depend on
+    # transcript length run once, on the first fixture's content
+    def scenarios(self) -> Dict[str, Tuple[bool, Callable[..., Awaitable[List[Sample]]]]]:
+        """Name -> (runs per fixture, operation) for every endpoint"""
+        return {
+            "root": (False, lambda fixture, i: self._get("/")),
+            "languages": (False, lambda fixture, i: self._get("/api/languages")),
+            "stats": (False, lambda fixture, i: self._get("/api/stats")),
+            "metrics": (False, lambda fixture, i: self._get("/metrics")),
+            "video_info": (True, self.video_info),
+            "video_info_fields": (True, self.video_info_fields),
+            "summarize": (True, lambda fixture, i: self._post("/api/summarize", self._transcript_body(fixture))),
+            "summarize_stream": (True, lambda fixture, i: self._post(
+                "/api/summarize/stream", self._transcript_body(fixture))),
+            "flashcards": (True, lambda fixture, i: self._post(
+                "/api/study/flashcards", {**self._transcript_body(fixture), "num_items": 10})),
+            "quiz": (True, lambda fixture, i: self._post(
+                "/api/study/quiz", {**self._transcript_body(fixture), "num_items": 5})),
+            "study_pack": (True, lambda fixture, i: self._post("/api/study/pack", self._transcript_body(fixture))),
+            "study_pack_stream": (True, lambda fixture, i: self._post(
+                "/api/study/pack/stream", self._transcript_body(fixture))),
+            "translate": (False, lambda fixture, i: self._post("/api/translate", {
+                "summary": self._summary(fixture, i), "target_language": "Spanish"})),
+            "translate_batch": (False, lambda fixture, i: self._post("/api/translate/batch", {
+                "summary": self._summary(fixture, i), "target_languages": TRANSLATION_LANGUAGES})),
+            "translate_batch_stream": (False, lambda fixture, i: self._post("/api/translate/batch/stream", {
+                "summary": self._summary(fixture, i), "target_languages": TRANSLATION_LANGUAGES})),
+            "download_pdf": (False, lambda fixture, i: self._post("/api/download/pdf", self._export_body(fixture, i))),
+            "download_doc": (False, lambda fixture, i: self._post("/api/download/doc", self._export_body(fixture, i))),
+            "download_study_pack": (False, self.download_study_pack),
+            "batch": (True, self.batch_flow),
+            "jobs": (True, self.job_flow),
+        }
+
+    async def prepare(self, labels: List[str]):
+        """Fetch each fixture once for the transcript handles and content later scenarios send"""
+        for label in labels:
+            video_id = fixture_video_id(FIXTURE_DURATIONS[label])
+            url = f"https://www.youtube.com/watch?v={video_id}"
+            response = await self.client.post("/api/video/info", json={
+                "url": url, "fields": ["video_id", "title", "transcript", "transcript_id"]
+            })
+            response.raise_for_status()
+            info = response.json()
+            fixture = {"label": label, "url": url, **info}
+
+            body = {"transcript_id": info["transcript_id"], "video_id": video_id, "video_title": info["title"]}
+            pack = (await self.client.post("/api/study/pack", json=body)).json()
+            fixture.update(summary=pack["summary"], flashcards=pack["flashcards"], quiz=pack["quiz"])
+            self.fixtures[label] = fixture
+
+    async def _timed(self, endpoint: str, method: str, path: str,
+                     body: Optional[dict] = None) -> Tuple[Sample, Optional[httpx.Response]]:
+        """Send one request, reading the whole body; streamed errors count as failures"""
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await self.client.request(method, path, json=body)
+            ok = response.status_code < 400 and b"event: error" not in response.content
+        except Exception as e:
+            print(f"Error requesting {path}: {e}")
+            ok = False
+        return (endpoint, time.perf_counter() - start, ok), response
+
+    async def _request(self, endpoint: str, method: str, path: str, body: Optional[dict] = None) -> Sample:
+        sample, _ = await self._timed(endpoint, method, path, body)
+        return sample
+
+    async def _get(self, path: str) -> List[Sample]:
+        return [await self._request(f"GET {path}", "GET", path)]
+
+    async def _post(self, path: str, body: dict) -> List[Sample]:
+        return [await self._request(f"POST {path}", "POST", path, body)]
+
+    def _transcript_body(self, fixture: Dict[str, Any]) -> dict:
+        return {"transcript_id": fixture["transcript_id"], "video_id": fixture["video_id"],
+                "video_title": fixture["title"], "use_cache": not self.cold}
+
+    def _summary(self, fixture: Dict[str, Any], i: int) -> List[dict]:
+        if not self.cold:
+            return fixture["summary"]
+        # Distinct points miss the translation memory
+        return [{**point, "point": f"{point['point']} (request {i})"} for point in fixture["summary"]]
+
+    def _title(self, fixture: Dict[str, Any], i: int) -> str:
+        # Distinct titles miss the export cache
+        return f"{fixture['title']} #{i}" if self.cold else fixture["title"]
+
+    def _export_body(self, fixture: Dict[str, Any], i: int) -> dict:
+        return {"video_title": self._title(fixture, i), "summary": fixture["summary"]}
+
+    def _url(self, fixture: Dict[str, Any]) -> str:
+        if not self.cold:
+            return fixture["url"]
+        # A new variant of the same length misses the transcript cache
+        seconds = FIXTURE_DURATIONS[fixture["label"]]
+        return f"https://www.youtube.com/watch?v={fixture_video_id(seconds, next(self._variants))}"
+
+    async def video_info(self, fixture: Dict[str, Any], i: int) -> List[Sample]:
+        return await self._post("/api/video/info", {"url": self._url(fixture)})
+
+    async def video_info_fields(self, fixture: Dict[str, Any], i: int) -> List[Sample]:
+        return [await self._request("POST /api/video/info (fields)", "POST", "/api/video/info", {
+            "url": self._url(fixture), "fields": ["video_id", "title", "transcript_id", "segment_count"]
+        })]
+
+    async def download_study_pack(self, fixture: Dict[str, Any], i: int) -> List[Sample]:
+        videos = [
+            {"video_title": f"{self._title(fixture, i)} part {part}", "url": fixture["url"],
+             "summary": fixture["summary"], "flashcards": fixture["flashcards"], "quiz": fixture["quiz"]}
+            for part in range(1, 4)
+        ]
+        return await self._post("/api/download/study-pack", {"videos": videos, "formats": ["pdf", "docx"]})
+
+    async def batch_flow(self, fixture: Dict[str, Any], i: int) -> List[Sample]:
+        """Start a playlist batch, follow its events to the end, then read and delete it"""
+        seconds = FIXTURE_DURATIONS[fixture["label"]]
+        playlist = f"https://www.youtube.com/playlist?list={fixture_playlist_id(seconds, BATCH_VIDEOS)}"
+        sample, response = await self._timed("POST /api/batch", "POST", "/api/batch",
+                                             {"urls": [playlist], "include": ["summary"]})
+        samples = [sample]
+        if not sample[2]:
+            return samples
+
+        batch_id = response.json()["batch_id"]
+        samples.append(await self._request("GET /api/batch/{id}/events", "GET", f"/api/batch/{batch_id}/events"))
+        samples.append(await self._request("GET /api/batch/{id}", "GET", f"/api/batch/{batch_id}"))
+        samples.append(await self._request("GET /api/batch/{id}/results", "GET", f"/api/batch/{batch_id}/results"))
+        samples.append(await self._request("DELETE /api/batch/{id}", "DELETE", f"/api/batch/{batch_id}"))
+        return samples
+
+    async def job_flow(self, fixture: Dict[str, Any], i: int) -> List[Sample]:
+        """Submit a summarize job, poll it to completion, then read, list and delete it"""
+        params = {"text": fixture["transcript"], "video_id": fixture["video_id"], "use_cache": not self.cold}
+        sample, response = await self._timed("POST /api/jobs", "POST", "/api/jobs",
+                                             {"kind": "summarize", "params": params})
+        samples = [sample]
+        if not sample[2]:
+            return samples
+
+        job_id = response.json()["job_id"]
+        while True:
+            sample, response = await self._timed("GET /api/jobs/{id}", "GET", f"/api/jobs/{job_id}")
+            samples.append(sample)
+            if not sample[2] or response.json()["status"] not in ("queued", "running"):
+                break
+            await asyncio.sleep(0.05)
+
+        samples.append(await self._request("GET /api/jobs/{id}/result", "GET", f"/api/jobs/{job_id}/result"))
+        samples.append(await self._request("GET /api/jobs", "GET", "/api/jobs?limit=20"))
+        samples.append(await self._request("DELETE /api/jobs/{id}", "DELETE", f"/api/jobs/{job_id}"))
+        return samples
+
+
+async def run_scenario(run: Callable[..., Awaitable[List[Sample]]], fixture: Optional[Dict[str, Any]],
+                       concurrency: int, requests: int) -> Tuple[Dict[str, List[Tuple[float, bool]]], float]:
+    """Run ``requests`` operations with at most ``concurrency`` in flight; returns samples per endpoint and wall time"""
+    counter = itertools.count()
+    samples: Dict[str, List[Tuple[float, bool]]] = {}
+
+    async def worker():
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            for endpoint, seconds, ok in await run(fixture, i):
+                samples.setdefault(endpoint, []).append((seconds, ok))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def summarize_samples(samples: List[Tuple[float, bool]], wall_seconds: float) -> Dict[str, Any]:
+    latencies = sorted(seconds for seconds, _ in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, ok in samples if not ok),
+        "throughput_rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def configure_environment(args: argparse.Namespace, state_dir: str):
+    """Point the app at throwaway state and the fake Gemini before it is imported"""
+    os.environ.update({
+        "GEMINI_API_KEY": "offline-benchmark",
+        "YOUTUBE_API_KEY": "",
+        "GEMINI_REQUESTS_PER_MINUTE": str(args.gemini_rpm),
+        "GEMINI_BURST": str(max(1, int(args.gemini_rpm // 4))),
+        "CACHE_DB_PATH": os.path.join(state_dir, "cache.db"),
+        "JOB_DB_PATH": os.path.join(state_dir, "jobs.db"),
+        "TIMING_LOG_THRESHOLD_MS": os.environ.get("TIMING_LOG_THRESHOLD_MS", str(10 * 60 * 1000)),
+    })
+
+    FakeGenerativeModel.latency = FakeLatency(args.gemini_latency, args.jitter, args.gemini_error_rate, args.seed)
+    FakeGenerativeModel.error_code = args.gemini_error_code
+    FakeTranscriptApi.latency = FakeLatency(args.transcript_latency, args.jitter, args.transcript_error_rate, args.seed)
+
+    import google.generativeai as genai
+    genai.GenerativeModel = FakeGenerativeModel
+
+    import services.youtube_service as youtube_module
+    youtube_module.YouTubeTranscriptApi = FakeTranscriptApi
+
+    import services.http_client as http_client
+    http_client._client = httpx.AsyncClient(
+        transport=youtube_transport(FakeLatency(args.oembed_latency, args.jitter, args.oembed_error_rate, args.seed))
+    )
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    from main import app
+
+    rows = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+            load_test = LoadTest(client, args.cold)
+            print(f"Preparing fixtures: {', '.join(args.fixtures)}")
+            await load_test.prepare(args.fixtures)
+            scenarios = load_test.scenarios()
+
+            header = (f"{'scenario':<22} {'endpoint':<32} {'fixture':>7} {'conc':>5} {'reqs':>5} {'errors':>6} "
+                      f"{'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak RSS MB':>12}")
+            if args.tracemalloc:
+                header += f" {'heap peak MB':>13}"
+            print(header)
+
+            for name in args.scenarios:
+                takes_fixture, scenario = scenarios[name]
+                for label in (args.fixtures if takes_fixture else ["-"]):
+                    fixture = load_test.fixtures.get(label, load_test.fixtures[args.fixtures[0]])
+                    for concurrency in args.concurrency:
+                        if args.tracemalloc:
+                            tracemalloc.reset_peak()
+                        samples, wall_seconds = await run_scenario(scenario, fixture, concurrency, args.requests)
+                        heap_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if args.tracemalloc else None
+                        rss = peak_rss_mb()
+
+                        for endpoint, endpoint_samples in samples.items():
+                            row = {"scenario": name, "endpoint": endpoint, "fixture": label,
+                                   "concurrency": concurrency, **summarize_samples(endpoint_samples, wall_seconds),
+                                   "peak_rss_mb": rss, "heap_peak_mb": heap_peak}
+                            rows.append(row)
+                            line = (f"{name:<22} {endpoint[:32]:<32} {label:>7} {concurrency:>5} {row['requests']:>5} "
+                                    f"{row['errors']:>6} {row['throughput_rps']:>8.1f} {row['p50_ms']:>9.1f} "
+                                    f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+                                    f"{rss if rss is not None else float('nan'):>12.1f}")
+                            if heap_peak is not None:
+                                line += f" {heap_peak:>13.1f}"
+                            print(line)
+    return rows
+
+
+def main():
+    all_scenarios = list(LoadTest(None, False).scenarios())
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=all_scenarios, default=all_scenarios)
+    parser.add_argument("--fixtures", nargs="+", choices=list(FIXTURE_DURATIONS), default=list(FIXTURE_DURATIONS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=16, help="operations per scenario, fixture and concurrency")
+    parser.add_argument("--cold", action="store_true", help="defeat response, transcript and export caches")
+    parser.add_argument("--gemini-latency", type=float, default=0.8, help="median seconds per Gemini call")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-error-code", type=int, default=503)
+    parser.add_argument("--gemini-rpm", type=float, default=1_000_000, help="gateway rate limit (requests/minute)")
+    parser.add_argument("--transcript-latency", type=float, default=0.3)
+    parser.add_argument("--transcript-error-rate", type=float, default=0.0)
+    parser.add_argument("--oembed-latency", type=float, default=0.05)
+    parser.add_argument("--oembed-error-rate", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.3, help="log-normal sigma applied to every fake latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracemalloc", action="store_true", help="also report Python heap peak (slower)")
+    parser.add_argument("--json", help="write result rows to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="you_learn_load_test_") as state_dir:
+        configure_environment(args, state_dir)
+        if args.tracemalloc:
+            tracemalloc.start()
+        rows = asyncio.run(run(args))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": rows}, f, indent=2)
+        print(f"Wrote {len(rows)} rows to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
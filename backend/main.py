@@ -1,18 +1,48 @@
 from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import os
-import tempfile
-from typing import Optional
+from contextlib import asynccontextmanager
+import json
+from typing import List, Optional
+from urllib.parse import quote
 
 from services.youtube_service import YouTubeService
 from services.summarization_service import SummarizationService
-from services.file_service import FileService
 from services.translation_service import TranslationService
 from services.study_tools_service import StudyToolsService
+from services.study_pack_service import StudyPackService
+from services.http_client import close_http_client
+from services.single_flight import single_flight
+from services.cache_service import get_llm_cache
+from services.llm_gateway import get_llm_gateway
+from services.context_selector import get_context_selector
+from services.executors import get_executor_stats, run_in_pool, shutdown_executors
+from services.render_pool import RenderPool
+from services.export_service import ExportService, EXPORT_FORMATS
+from services.bulk_export_service import BulkExportService
+from services.batch_service import BatchIngestService
+from services.job_service import JobService
+from services.responses import CompressionMiddleware, FastJSONResponse
+from services.metrics import MetricsMiddleware, render_metrics
+from services.profiler import SamplingProfiler
+from services.request_timing import TimingMiddleware
 
-app = FastAPI(title="You Learn API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pick up jobs a crash or restart left unfinished
+    job_service.resume()
+    yield
+    job_service.shutdown()
+    batch_service.shutdown()
+    # Release pooled keep-alive connections and worker threads on shutdown
+    await close_http_client()
+    shutdown_executors()
+    render_pool.shutdown()
+
+app = FastAPI(
+    title="You Learn API", version="1.0.0", lifespan=lifespan, default_response_class=FastJSONResponse
+)
 
 # Configure CORS
 app.add_middleware(
@@ -23,29 +53,160 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON bodies; streamed responses pass through untouched
+app.add_middleware(CompressionMiddleware)
+
+# Wraps compression, so recorded latencies include it and streamed bodies
+app.add_middleware(MetricsMiddleware)
+
+# Server-Timing header, slow-request log lines and the opt-in sampling profiler
+profiler = SamplingProfiler()
+app.add_middleware(TimingMiddleware, profiler=profiler)
+
 # Initialize services
 youtube_service = YouTubeService()
 summarization_service = SummarizationService()
-file_service = FileService()
 translation_service = TranslationService()
 study_tools_service = StudyToolsService()
+study_pack_service = StudyPackService(summarization_service, study_tools_service)
+render_pool = RenderPool()
+export_service = ExportService(render_pool)
+bulk_export_service = BulkExportService(
+    export_service, youtube_service, summarization_service, study_tools_service
+)
+batch_service = BatchIngestService(youtube_service, summarization_service, study_tools_service)
+
+# Long-running operations that can also be submitted as background jobs
+job_service = JobService()
+job_service.register("video_info", youtube_service.get_video_info)
+job_service.register("summarize", summarization_service.summarize)
+job_service.register("flashcards", study_tools_service.generate_flashcards)
+job_service.register("quiz", study_tools_service.generate_quiz)
+job_service.register("study_pack", study_pack_service.generate)
+job_service.register("translate", translation_service.translate_summary)
+job_service.register("translate_batch", translation_service.translate_summary_multi)
+job_service.register(
+    "export", export_service.export,
+    media_type=lambda params: EXPORT_FORMATS.get(params.get("export_format"), {}).get("media_type", "application/octet-stream")
+)
+
+# Job kinds that accept a transcript_id/video_id handle, with the parameter the transcript fills
+JOB_TRANSCRIPT_PARAMS = {"summarize": "text", "flashcards": "transcript", "quiz": "transcript", "study_pack": "transcript"}
+# Of those, the kinds that also take the video id and timestamped segments
+JOB_TIMESTAMPED_KINDS = ("summarize", "study_pack")
+
+VIDEO_INFO_FIELDS = (
+    "video_id", "transcript_id", "title", "author_name", "thumbnail_url",
+    "segment_count", "transcript", "transcript_with_timestamps"
+)
 
 class VideoRequest(BaseModel):
     url: str
+    # Subset of VIDEO_INFO_FIELDS to return; all of them when omitted
+    fields: Optional[List[str]] = None
 
 class SummarizeRequest(BaseModel):
-    transcript: str
+    transcript: Optional[str] = None
+    transcript_id: Optional[str] = None
     video_title: str
     transcript_with_timestamps: list = None
+    video_id: Optional[str] = None
+    use_cache: bool = True
 
 class TranslateRequest(BaseModel):
     summary: list
     target_language: str
 
+class MultiTranslateRequest(BaseModel):
+    summary: list
+    target_languages: List[str]
+
+class StudyPackVideo(BaseModel):
+    video_title: str = ""
+    url: Optional[str] = None
+    summary: Optional[list] = None
+    flashcards: Optional[list] = None
+    quiz: Optional[dict] = None
+
+class StudyPackExportRequest(BaseModel):
+    videos: List[StudyPackVideo]
+    formats: List[str] = ["pdf", "docx"]
+    include: List[str] = ["summary", "flashcards", "quiz"]
+    num_items: int = 10
+
+class BatchRequest(BaseModel):
+    urls: List[str]
+    include: List[str] = ["summary"]
+    num_items: int = 10
+
+class JobRequest(BaseModel):
+    kind: str
+    params: dict = {}
+
 class StudyToolsRequest(BaseModel):
-    transcript: str
+    transcript: Optional[str] = None
+    transcript_id: Optional[str] = None
+    video_id: Optional[str] = None
     video_title: str
     num_items: int = 10
+    use_cache: bool = True
+
+class StudyPackRequest(BaseModel):
+    transcript: Optional[str] = None
+    transcript_id: Optional[str] = None
+    video_title: str
+    transcript_with_timestamps: Optional[List[dict]] = None
+    video_id: Optional[str] = None
+    num_flashcards: int = 10
+    num_questions: int = 5
+    use_cache: bool = True
+
+async def _lookup_transcript(transcript_id: Optional[str], video_id: Optional[str]) -> dict:
+    """Stored transcript for a handle, as an HTTP error if it cannot be found or fetched"""
+    if not transcript_id and not video_id:
+        raise HTTPException(status_code=400, detail="Send transcript, transcript_id or video_id")
+
+    try:
+        return await youtube_service.resolve_transcript(transcript_id, video_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to fetch transcript: {str(e)}")
+
+async def _resolve_transcript(request: BaseModel) -> bool:
+    """Fill in the transcript from the server-side store when only a handle was sent.
+
+    Returns True when the transcript came from the store, which holds it
+    already normalized.
+    """
+    if request.transcript is not None:
+        return False
+
+    stored = await _lookup_transcript(request.transcript_id, request.video_id)
+    request.transcript = stored["text"]
+    request.video_id = stored["video_id"]
+    if hasattr(request, "transcript_with_timestamps") and request.transcript_with_timestamps is None:
+        request.transcript_with_timestamps = stored["with_timestamps"]
+    return True
+
+async def _resolve_job_params(kind: str, params: dict) -> dict:
+    """Job params with a transcript handle swapped for the stored transcript, as the endpoints do"""
+    text_param = JOB_TRANSCRIPT_PARAMS.get(kind)
+    if text_param is None or params.get(text_param) is not None:
+        return params
+    if not params.get("transcript_id") and not params.get("video_id"):
+        # Left for JobService to report as a missing parameter
+        return params
+
+    stored = await _lookup_transcript(params.get("transcript_id"), params.get("video_id"))
+    resolved = {key: value for key, value in params.items() if key not in ("transcript_id", "video_id")}
+    resolved[text_param] = stored["text"]
+    resolved["normalized"] = True
+    if kind in JOB_TIMESTAMPED_KINDS:
+        resolved["video_id"] = stored["video_id"]
+        if resolved.get("transcript_with_timestamps") is None:
+            resolved["transcript_with_timestamps"] = stored["with_timestamps"]
+    return resolved
 
 @app.get("/")
 async def root():
@@ -54,24 +215,82 @@ async def root():
 @app.post("/api/video/info")
 async def get_video_info(request: VideoRequest):
     """Get video information and transcript"""
+    if request.fields is not None:
+        unknown_fields = [field for field in request.fields if field not in VIDEO_INFO_FIELDS]
+        if unknown_fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown_fields)}. Choose from: {', '.join(VIDEO_INFO_FIELDS)}"
+            )
+
     try:
         video_info = await youtube_service.get_video_info(request.url)
-        return video_info
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    if request.fields is not None:
+        video_info = {field: video_info[field] for field in request.fields}
+    # Plain JSON data: skip the generic encoder and serialize directly
+    return FastJSONResponse(video_info)
+
 @app.post("/api/summarize")
 async def summarize_transcript(request: SummarizeRequest):
     """Summarize the video transcript"""
+    normalized = await _resolve_transcript(request)
     try:
         summary = await summarization_service.summarize(
             request.transcript,
-            request.transcript_with_timestamps
+            request.transcript_with_timestamps,
+            request.video_id,
+            request.use_cache,
+            normalized=normalized
         )
         return {"summary": summary}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/summarize/stream")
+async def summarize_transcript_stream(request: SummarizeRequest):
+    """Stream summary bullets as Server-Sent Events while they are generated"""
+    normalized = await _resolve_transcript(request)
+    async def event_stream():
+        try:
+            async for event in summarization_service.summarize_stream(
+                request.transcript,
+                request.transcript_with_timestamps,
+                request.video_id,
+                request.use_cache,
+                normalized=normalized
+            ):
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _content_disposition(filename: str) -> str:
+    """Attachment header that survives non-ASCII video titles"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def _download_response(content: bytes, export_format: str, filename: str) -> StreamingResponse:
+    """Stream an in-memory export back in chunks"""
+    chunk_size = 64 * 1024
+    return StreamingResponse(
+        (content[i:i + chunk_size] for i in range(0, len(content), chunk_size)),
+        media_type=EXPORT_FORMATS[export_format]["media_type"],
+        headers={
+            "Content-Disposition": _content_disposition(filename),
+            "Content-Length": str(len(content))
+        }
+    )
+
 @app.post("/api/download/pdf")
 async def download_pdf(request: dict):
     """Generate and download PDF summary"""
@@ -79,13 +298,10 @@ async def download_pdf(request: dict):
         video_title = request.get("video_title", "Video Summary")
         summary = request.get("summary", "")
 
-        pdf_path = file_service.generate_pdf(video_title, summary)
+        # Rendered in a worker process and cached by content
+        content = await export_service.export("pdf", video_title, summary)
 
-        return FileResponse(
-            pdf_path,
-            media_type="application/pdf",
-            filename=f"{video_title}_summary.pdf"
-        )
+        return _download_response(content, "pdf", f"{video_title}_summary.pdf")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -96,16 +312,123 @@ async def download_doc(request: dict):
         video_title = request.get("video_title", "Video Summary")
         summary = request.get("summary", "")
 
-        doc_path = file_service.generate_doc(video_title, summary)
+        content = await export_service.export("docx", video_title, summary)
 
-        return FileResponse(
-            doc_path,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            filename=f"{video_title}_summary.docx"
-        )
+        return _download_response(content, "docx", f"{video_title}_summary.docx")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/download/study-pack")
+async def download_study_pack(request: StudyPackExportRequest):
+    """Export summaries, flashcards and quizzes for many videos as a streamed ZIP"""
+    videos = [video.model_dump() for video in request.videos]
+    try:
+        bulk_export_service.validate(videos, request.formats, request.include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        bulk_export_service.stream_zip(videos, request.formats, request.include, request.num_items),
+        media_type="application/zip",
+        headers={"Content-Disposition": _content_disposition("study_pack.zip")}
+    )
+
+@app.post("/api/batch")
+async def start_batch(request: BatchRequest):
+    """Queue every video of the given playlists, channels or video URLs for processing"""
+    try:
+        return await batch_service.start(request.urls, request.include, request.num_items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to list videos: {str(e)}")
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    """Per-video progress of a batch"""
+    try:
+        return batch_service.progress(batch_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/batch/{batch_id}/results")
+async def get_batch_results(batch_id: str):
+    """Generated content for every finished video of a batch"""
+    try:
+        return batch_service.results(batch_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/batch/{batch_id}/events")
+async def watch_batch(batch_id: str):
+    """Stream batch progress as Server-Sent Events until it finishes"""
+    try:
+        batch_service.progress(batch_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    async def event_stream():
+        async for snapshot in batch_service.watch(batch_id):
+            yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete("/api/batch/{batch_id}")
+async def cancel_batch(batch_id: str):
+    """Stop a running batch, keeping results finished so far"""
+    try:
+        return await batch_service.cancel(batch_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """Start a long-running operation in the background and return its job id"""
+    params = await _resolve_job_params(request.kind, request.params)
+    try:
+        return await job_service.submit(request.kind, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Most recent jobs, optionally filtered by status"""
+    return {"jobs": await job_service.list(status, limit), "kinds": job_service.kinds()}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status and progress of a job"""
+    try:
+        return await job_service.get(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a completed job; files are returned as downloads"""
+    try:
+        job = await job_service.get(job_id, with_result=True)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    if isinstance(job["result"], bytes):
+        return Response(content=job["result"], media_type=job_service.media_type(job))
+    return {"job_id": job_id, "kind": job["kind"], "result": job["result"]}
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    try:
+        return await job_service.cancel(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 @app.post("/api/translate")
 async def translate_summary(request: TranslateRequest):
     """Translate summary to target language"""
@@ -117,6 +440,81 @@ async def translate_summary(request: TranslateRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/stats")
+async def get_stats():
+    """Get cache and request coalescing statistics"""
+    # These count rows in SQLite, so read them on the disk pool
+    disk_stats = await run_in_pool("disk", lambda: {
+        "transcript_cache": youtube_service.get_cache_stats(),
+        "transcript_store": youtube_service.get_store_stats(),
+        "llm_cache": get_llm_cache().stats(),
+        "translation_memory": translation_service.translation_memory.stats(),
+    })
+    return {
+        **disk_stats,
+        "llm_gateway": get_llm_gateway().stats(),
+        "context_selection": get_context_selector().stats(),
+        "executors": get_executor_stats(),
+        "render_pool": render_pool.stats(),
+        "export_cache": export_service.stats(),
+        "batches": batch_service.stats(),
+        "jobs": await job_service.stats(),
+        "profiler": profiler.stats(),
+        "single_flight": {**single_flight.stats, "in_flight": single_flight.in_flight()}
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics for latency, Gemini usage, fallbacks and queue depths"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+def _validate_target_languages(target_languages: List[str]):
+    """Reject language codes that get_supported_languages() does not list"""
+    supported = translation_service.get_supported_languages()
+    unsupported = [code for code in target_languages if code not in supported]
+    if not target_languages:
+        raise HTTPException(status_code=400, detail="No target languages given")
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported languages: {', '.join(unsupported)}")
+
+@app.post("/api/translate/batch")
+async def translate_summary_batch(request: MultiTranslateRequest):
+    """Translate summary to several target languages concurrently"""
+    _validate_target_languages(request.target_languages)
+    try:
+        translations = {}
+        async for language, translated_summary in translation_service.translate_summary_multi(
+            request.summary, request.target_languages
+        ):
+            translations[language] = translated_summary
+        # Report in the order the languages were requested
+        return {"translations": {code: translations[code] for code in request.target_languages}}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/translate/batch/stream")
+async def translate_summary_batch_stream(request: MultiTranslateRequest):
+    """Stream each language's translation as a Server-Sent Event when it completes"""
+    _validate_target_languages(request.target_languages)
+
+    async def event_stream():
+        try:
+            async for language, translated_summary in translation_service.translate_summary_multi(
+                request.summary, request.target_languages
+            ):
+                data = {"language": language, "translated_summary": translated_summary}
+                yield f"event: translation\ndata: {json.dumps(data)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/languages")
 async def get_supported_languages():
     """Get list of supported languages for translation"""
@@ -129,9 +527,10 @@ async def get_supported_languages():
 @app.post("/api/study/flashcards")
 async def generate_flashcards(request: StudyToolsRequest):
     """Generate flashcards from video transcript"""
+    normalized = await _resolve_transcript(request)
     try:
         flashcards = await study_tools_service.generate_flashcards(
-            request.transcript, request.video_title, request.num_items
+            request.transcript, request.video_title, request.num_items, request.use_cache, normalized=normalized
         )
         return {"flashcards": flashcards}
     except Exception as e:
@@ -140,14 +539,60 @@ async def generate_flashcards(request: StudyToolsRequest):
 @app.post("/api/study/quiz")
 async def generate_quiz(request: StudyToolsRequest):
     """Generate quiz from video transcript"""
+    normalized = await _resolve_transcript(request)
     try:
         quiz = await study_tools_service.generate_quiz(
-            request.transcript, request.video_title, request.num_items
+            request.transcript, request.video_title, request.num_items, request.use_cache, normalized=normalized
         )
         return {"quiz": quiz}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/study/pack")
+async def generate_study_pack(request: StudyPackRequest):
+    """Generate summary, flashcards and quiz from one transcript"""
+    normalized = await _resolve_transcript(request)
+    try:
+        return await study_pack_service.generate(
+            request.transcript,
+            request.video_title,
+            request.transcript_with_timestamps,
+            request.video_id,
+            request.num_flashcards,
+            request.num_questions,
+            request.use_cache,
+            normalized=normalized
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/study/pack/stream")
+async def generate_study_pack_stream(request: StudyPackRequest):
+    """Stream summary, flashcards and quiz as Server-Sent Events as each one finishes"""
+    normalized = await _resolve_transcript(request)
+    async def event_stream():
+        try:
+            async for kind, result in study_pack_service.generate_stream(
+                request.transcript,
+                request.video_title,
+                request.transcript_with_timestamps,
+                request.video_id,
+                request.num_flashcards,
+                request.num_questions,
+                request.use_cache,
+                normalized=normalized
+            ):
+                yield f"event: {kind}\ndata: {json.dumps(result)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
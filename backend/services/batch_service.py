@@ -0,0 +1,232 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+BATCH_CONTENT_KINDS = ("summary", "flashcards", "quiz")
+
+
+class BatchIngestService:
+    """Fetch and summarize whole playlists or URL lists in the background.
+
+    Videos of every batch go on one queue drained by a single pool of
+    BATCH_WORKERS workers, so concurrent batches share the same capacity.
+    Every Gemini call still passes through the shared gateway, so batches
+    are held to the same global rate limit as interactive traffic. Progress
+    is kept per item and can be polled or streamed.
+    """
+
+    def __init__(self, youtube_service, summarization_service, study_tools_service):
+        self.youtube_service = youtube_service
+        self.summarization_service = summarization_service
+        self.study_tools_service = study_tools_service
+
+        self.workers = int(os.getenv('BATCH_WORKERS', '4'))
+        self.max_videos = int(os.getenv('BATCH_MAX_VIDEOS', '500'))
+        self.max_retained = int(os.getenv('BATCH_MAX_RETAINED', '50'))
+
+        self._batches: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self, urls: List[str], include: List[str], num_items: int = 10) -> Dict[str, Any]:
+        """Expand playlist/channel URLs, queue every video and start the workers"""
+        unknown_kinds = [kind for kind in include if kind not in BATCH_CONTENT_KINDS]
+        if not include or unknown_kinds:
+            raise ValueError(f"Contents must be chosen from: {', '.join(BATCH_CONTENT_KINDS)}")
+        if not urls:
+            raise ValueError("No URLs given")
+
+        expanded = await asyncio.gather(*(self.youtube_service.get_collection_video_ids(url) for url in urls))
+        video_ids = list(dict.fromkeys(video_id for ids in expanded for video_id in ids))
+        if len(video_ids) > self.max_videos:
+            raise ValueError(f"At most {self.max_videos} videos can be processed in one batch")
+
+        batch_id = uuid.uuid4().hex
+        batch = {
+            "batch_id": batch_id,
+            "status": "running",
+            "created_at": time.time(),
+            "finished_at": None,
+            "include": include,
+            "num_items": num_items,
+            "items": [
+                {"video_id": video_id, "title": None, "status": "queued", "error": None, "result": None}
+                for video_id in video_ids
+            ],
+            "changed": asyncio.Condition(),
+            "version": 0,
+            "remaining": len(video_ids),
+            # Tasks processing this batch's items right now, cancelled with the batch
+            "active": set(),
+        }
+        self._batches[batch_id] = batch
+        self._evict()
+
+        self._start_workers()
+        for item in batch["items"]:
+            self._queue.put_nowait((batch, item))
+        return self._progress(batch)
+
+    def _start_workers(self):
+        """Start the shared worker pool, replacing any worker that has exited"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.workers:
+            self._workers.append(asyncio.ensure_future(self._worker()))
+
+    async def _worker(self):
+        while True:
+            batch, item = await self._queue.get()
+            # Items of cancelled batches are dropped when they reach the front of the queue
+            if batch["status"] == "running":
+                task = asyncio.ensure_future(self._process(batch, item))
+                batch["active"].add(task)
+                # wait() rather than await, so cancelling the batch's task does not stop this worker
+                await asyncio.wait([task])
+                batch["active"].discard(task)
+
+            batch["remaining"] -= 1
+            if batch["remaining"] == 0 and batch["status"] == "running":
+                batch["status"] = "completed"
+                batch["finished_at"] = time.time()
+                await self._notify(batch)
+
+    def _mark_cancelled(self, batch: Dict[str, Any]):
+        batch["status"] = "cancelled"
+        for item in batch["items"]:
+            if item["status"] not in ("done", "failed"):
+                item["status"] = "cancelled"
+
+    async def _process(self, batch: Dict[str, Any], item: Dict[str, Any]):
+        """Fetch, then generate the requested content for one video"""
+        try:
+            await self._set_status(batch, item, "fetching")
+            info = await self.youtube_service.get_video_info(f"https://www.youtube.com/watch?v={item['video_id']}")
+            item["title"] = info["title"]
+
+            await self._set_status(batch, item, "generating")
+            generators = {
+                "summary": lambda: self.summarization_service.summarize(
+                    info['transcript'], info['transcript_with_timestamps'], info['video_id'], normalized=True
+                ),
+                "flashcards": lambda: self.study_tools_service.generate_flashcards(
+                    info['transcript'], info['title'], batch["num_items"], normalized=True
+                ),
+                "quiz": lambda: self.study_tools_service.generate_quiz(
+                    info['transcript'], info['title'], batch["num_items"], normalized=True
+                ),
+            }
+            results = await asyncio.gather(*(generators[kind]() for kind in batch["include"]))
+            item["result"] = dict(zip(batch["include"], results))
+            await self._set_status(batch, item, "done")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error processing batch item {item['video_id']}: {e}")
+            item["error"] = str(e)
+            await self._set_status(batch, item, "failed")
+
+    async def _set_status(self, batch: Dict[str, Any], item: Dict[str, Any], status: str):
+        item["status"] = status
+        await self._notify(batch)
+
+    async def _notify(self, batch: Dict[str, Any]):
+        async with batch["changed"]:
+            batch["version"] += 1
+            batch["changed"].notify_all()
+
+    def _evict(self):
+        """Forget the oldest finished batches beyond the retention limit"""
+        while len(self._batches) > self.max_retained:
+            for batch_id, batch in self._batches.items():
+                if batch["status"] != "running":
+                    del self._batches[batch_id]
+                    break
+            else:
+                return
+
+    def _get(self, batch_id: str) -> Dict[str, Any]:
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            raise KeyError(f"Unknown batch: {batch_id}")
+        return batch
+
+    def progress(self, batch_id: str) -> Dict[str, Any]:
+        """Batch status with per-item progress (results omitted)"""
+        return self._progress(self._get(batch_id))
+
+    def _progress(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for item in batch["items"]:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+
+        return {
+            "batch_id": batch["batch_id"],
+            "status": batch["status"],
+            "total": len(batch["items"]),
+            "counts": counts,
+            "created_at": batch["created_at"],
+            "finished_at": batch["finished_at"],
+            "items": [
+                {key: item[key] for key in ("video_id", "title", "status", "error")}
+                for item in batch["items"]
+            ],
+        }
+
+    def results(self, batch_id: str) -> Dict[str, Any]:
+        """Batch status with the generated content of every finished item"""
+        batch = self._get(batch_id)
+        return {
+            "batch_id": batch["batch_id"],
+            "status": batch["status"],
+            "items": [
+                {key: item[key] for key in ("video_id", "title", "status", "error", "result")}
+                for item in batch["items"]
+            ],
+        }
+
+    async def cancel(self, batch_id: str) -> Dict[str, Any]:
+        """Stop a running batch; finished items keep their results"""
+        batch = self._get(batch_id)
+        if batch["status"] == "running":
+            self._mark_cancelled(batch)
+            batch["finished_at"] = time.time()
+            for task in batch["active"]:
+                task.cancel()
+            await self._notify(batch)
+        return self._progress(batch)
+
+    async def watch(self, batch_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a progress snapshot on every item change until the batch finishes"""
+        # Hold on to the batch itself so eviction while streaming does not end the stream with an error
+        batch = self._get(batch_id)
+        seen = -1
+        while True:
+            async with batch["changed"]:
+                await batch["changed"].wait_for(lambda: batch["version"] != seen)
+                seen = batch["version"]
+            snapshot = self._progress(batch)
+            yield snapshot
+            if snapshot["status"] != "running":
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of retained and running batches and of videos waiting for a worker"""
+        running = sum(1 for batch in self._batches.values() if batch["status"] == "running")
+        return {
+            "batches": len(self._batches),
+            "running": running,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    def shutdown(self):
+        """Stop the shared workers; unfinished batches are not resumed"""
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        self._queue = None
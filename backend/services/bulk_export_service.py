@@ -0,0 +1,151 @@
+import asyncio
+import os
+import re
+import zipfile
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from services.executors import run_in_pool
+from services.export_service import EXPORT_FORMATS, ExportService
+
+CONTENT_KINDS = ("summary", "flashcards", "quiz")
+
+
+class _ZipSink:
+    """Write-only buffer that zipfile streams into; drained after every entry"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class BulkExportService:
+    """Render study packs for many videos into a ZIP streamed as entries finish.
+
+    Videos are processed by a fixed number of workers and rendered files pass
+    through a bounded queue, so memory stays flat however large the batch.
+    """
+
+    def __init__(self, export_service: ExportService, youtube_service, summarization_service, study_tools_service):
+        self.export_service = export_service
+        self.youtube_service = youtube_service
+        self.summarization_service = summarization_service
+        self.study_tools_service = study_tools_service
+
+        self.max_videos = int(os.getenv('BULK_EXPORT_MAX_VIDEOS', '100'))
+        self.video_concurrency = int(os.getenv('BULK_EXPORT_VIDEO_CONCURRENCY', '4'))
+        self.buffer_size = int(os.getenv('BULK_EXPORT_BUFFER_FILES', '8'))
+
+    def validate(self, videos: List[Dict], formats: List[str], include: List[str]):
+        """Raise ValueError for requests the exporter cannot serve"""
+        if not videos:
+            raise ValueError("No videos given")
+        if len(videos) > self.max_videos:
+            raise ValueError(f"At most {self.max_videos} videos can be exported at once")
+        unknown_formats = [f for f in formats if f not in EXPORT_FORMATS]
+        if not formats or unknown_formats:
+            raise ValueError(f"Formats must be chosen from: {', '.join(EXPORT_FORMATS)}")
+        unknown_kinds = [k for k in include if k not in CONTENT_KINDS]
+        if not include or unknown_kinds:
+            raise ValueError(f"Contents must be chosen from: {', '.join(CONTENT_KINDS)}")
+        empty = [str(position) for position, video in enumerate(videos, 1)
+                 if not video.get('url') and all(video.get(kind) is None for kind in include)]
+        if empty:
+            raise ValueError(f"Videos {', '.join(empty)} have no url and none of the requested contents")
+
+    async def stream_zip(self, videos: List[Dict], formats: List[str], include: List[str],
+                         num_items: int = 10) -> AsyncIterator[bytes]:
+        """Yield ZIP bytes as each rendered document is added to the archive"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.buffer_size)
+        pending_videos = iter(enumerate(videos, 1))
+        errors: List[str] = []
+
+        async def worker():
+            for position, video in pending_videos:
+                folder = self._folder_name(position, video.get('video_title', ''))
+                try:
+                    contents = await self._resolve_contents(video, include, num_items)
+                except Exception as e:
+                    errors.append(f"{folder}: {e}")
+                    continue
+
+                for kind in include:
+                    if contents.get(kind) is None:
+                        # Only possible without a url; say so rather than leave the file out silently
+                        errors.append(f"{folder}/{kind}: not supplied and no url to generate it from")
+                        continue
+                    for export_format in formats:
+                        name = f"{folder}/{kind}.{EXPORT_FORMATS[export_format]['extension']}"
+                        try:
+                            content = await self.export_service.export(
+                                export_format, video.get('video_title', 'Video'), contents[kind], kind
+                            )
+                        except Exception as e:
+                            errors.append(f"{name}: {e}")
+                            continue
+                        await queue.put((name, content))
+
+        async def run_workers():
+            try:
+                await asyncio.gather(*(worker() for _ in range(min(self.video_concurrency, len(videos)))))
+            finally:
+                await queue.put(None)
+
+        producer = asyncio.ensure_future(run_workers())
+        sink = _ZipSink()
+        try:
+            with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    name, content = item
+                    # PDF and DOCX are already compressed; store them as-is
+                    await run_in_pool("cpu", archive.writestr, name, content)
+                    yield sink.drain()
+
+                if errors:
+                    archive.writestr("errors.txt", "\n".join(errors) + "\n")
+            yield sink.drain()
+        finally:
+            producer.cancel()
+
+    async def _resolve_contents(self, video: Dict, include: List[str], num_items: int) -> Dict[str, Any]:
+        """Use the supplied content, generating what is missing when a URL is given"""
+        contents = {kind: video.get(kind) for kind in include}
+        missing = [kind for kind in include if contents[kind] is None]
+        if not missing or not video.get('url'):
+            return contents
+
+        info = await self.youtube_service.get_video_info(video['url'])
+        title = video.get('video_title') or info['title']
+        # Fetched transcripts are already normalized
+        generators = {
+            "summary": lambda: self.summarization_service.summarize(
+                info['transcript'], info['transcript_with_timestamps'], info['video_id'], normalized=True
+            ),
+            "flashcards": lambda: self.study_tools_service.generate_flashcards(
+                info['transcript'], title, num_items, normalized=True
+            ),
+            "quiz": lambda: self.study_tools_service.generate_quiz(
+                info['transcript'], title, num_items, normalized=True
+            ),
+        }
+        results = await asyncio.gather(*(generators[kind]() for kind in missing))
+        contents.update(zip(missing, results))
+        return contents
+
+    def _folder_name(self, position: int, video_title: Optional[str]) -> str:
+        """Filesystem-safe, ordered folder name for one video"""
+        safe_title = re.sub(r'[^\w\- ]+', '', video_title or '').strip()[:80]
+        return f"{position:02d}_{safe_title or 'video'}"
@@ -0,0 +1,362 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.executors import run_in_pool
+
+DEFAULT_CACHE_DB_PATH = os.path.join(tempfile.gettempdir(), "you_learn_cache.db")
+
+_llm_cache = None
+
+
+class TwoTierCache:
+    """In-process LRU backed by a persistent SQLite store.
+
+    Values must be JSON serializable. Entries expire after ``ttl_seconds`` in
+    both tiers; the memory tier holds at most ``max_memory_items`` entries and
+    the disk tier at most ``max_disk_items`` per namespace, evicting the least
+    recently used entries first.
+
+    Coroutines should use ``aget``/``aset``: memory hits are served inline
+    and SQLite reads, writes and commits run on the disk pool.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_memory_items: int = 256,
+        max_disk_items: int = 5000,
+        ttl_seconds: float = 7 * 24 * 3600,
+        db_path: Optional[str] = None,
+    ):
+        self.namespace = namespace
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path or os.getenv("CACHE_DB_PATH", DEFAULT_CACHE_DB_PATH)
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        # Guards the memory tier and counters; _disk_lock guards the connection.
+        # Code holding _disk_lock may take _lock, never the other way round.
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "disk_errors": 0,
+        }
+        self._conn = self._open_db()
+
+    def _open_db(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite store, falling back to memory-only on failure"""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed "
+                "ON cache_entries (namespace, accessed_at)"
+            )
+            conn.commit()
+            return conn
+        except Exception as e:
+            print(f"Error opening cache database {self.db_path}: {e}")
+            return None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        found, value = self._memory_get(key, now)
+        if found:
+            return value
+        return self._load(key, now)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() for coroutines: the disk tier is read on the disk pool"""
+        now = time.time()
+        found, value = self._memory_get(key, now)
+        if found:
+            return value
+        return await run_in_pool("disk", self._load, key, now)
+
+    def set(self, key: str, value: Any):
+        """Store value under key in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._memory_set(key, value, now)
+        self._store(key, value, now)
+
+    async def aset(self, key: str, value: Any):
+        """set() for coroutines: encoding and the disk write run on the disk pool"""
+        now = time.time()
+        with self._lock:
+            self._memory_set(key, value, now)
+        await run_in_pool("disk", self._store, key, value, now)
+
+    async def aget_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """aget() for several keys, reading every memory miss in one disk pool call"""
+        now = time.time()
+        values = []
+        misses = []
+        for index, key in enumerate(keys):
+            found, value = self._memory_get(key, now)
+            values.append(value)
+            if not found:
+                misses.append(index)
+        if misses:
+            loaded = await run_in_pool("disk", lambda: [self._load(keys[index], now) for index in misses])
+            for index, value in zip(misses, loaded):
+                values[index] = value
+        return values
+
+    async def aset_many(self, items: Dict[str, Any]):
+        """aset() for several entries, writing them to disk in one disk pool call"""
+        now = time.time()
+        with self._lock:
+            for key, value in items.items():
+                self._memory_set(key, value, now)
+        await run_in_pool("disk", lambda: [self._store(key, value, now) for key, value in items.items()])
+
+    def delete(self, key: str):
+        """Remove key from both tiers"""
+        with self._lock:
+            self._memory.pop(key, None)
+        if self._conn is None:
+            return
+        with self._disk_lock:
+            try:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                self._conn.commit()
+            except sqlite3.Error:
+                self._count("disk_errors")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current tier sizes"""
+        with self._disk_lock:
+            disk_items = self._disk_count()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+        stats["disk_items"] = disk_items
+
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _memory_get(self, key: str, now: float) -> Tuple[bool, Any]:
+        """(True, value) on a fresh memory hit, else (False, None)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return False, None
+            created_at, value = entry
+            if now - created_at <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return True, value
+            del self._memory[key]
+            self._stats["expired"] += 1
+            return False, None
+
+    def _load(self, key: str, now: float) -> Optional[Any]:
+        """Look key up on disk and promote it to memory (blocking)"""
+        with self._disk_lock:
+            row = self._disk_get(key, now)
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+
+            value, created_at = row
+            self._stats["disk_hits"] += 1
+            self._memory_set(key, value, created_at)
+            return value
+
+    def _store(self, key: str, value: Any, now: float):
+        """Write key to disk (blocking)"""
+        with self._disk_lock:
+            self._disk_set(key, value, now)
+
+    def _memory_set(self, key: str, value: Any, created_at: float):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                self._conn.commit()
+                self._count("expired")
+                return None
+
+            self._conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self._conn.commit()
+            return json.loads(value), created_at
+        except (sqlite3.Error, ValueError):
+            self._count("disk_errors")
+            return None
+
+    def _disk_set(self, key: str, value: Any, now: float):
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now, now),
+            )
+            self._evict_disk(now)
+            self._conn.commit()
+        except (sqlite3.Error, TypeError, ValueError):
+            self._count("disk_errors")
+
+    def _evict_disk(self, now: float):
+        """Drop expired entries, then the least recently used beyond the size bound"""
+        cursor = self._conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND created_at < ?",
+            (self.namespace, now - self.ttl_seconds),
+        )
+        self._count("expired", max(cursor.rowcount, 0))
+
+        overflow = self._disk_count() - self.max_disk_items
+        if overflow > 0:
+            self._conn.execute(
+                """
+                DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                    SELECT key FROM cache_entries WHERE namespace = ?
+                    ORDER BY accessed_at ASC LIMIT ?
+                )
+                """,
+                (self.namespace, self.namespace, overflow),
+            )
+            self._count("evictions", overflow)
+
+    def _disk_count(self) -> int:
+        if self._conn is None:
+            return 0
+        try:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+            return row[0]
+        except sqlite3.Error:
+            return 0
+
+
+class ArtifactCache:
+    """In-memory LRU for rendered files, bounded by total size in bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes for key, or None on a miss"""
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self._stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            return data
+
+    def set(self, key: str, data: bytes):
+        """Store data under key, evicting least recently used entries to fit"""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+                self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            return {**self._stats, "items": len(self._items), "bytes": self._size, "max_bytes": self.max_bytes}
+
+
+def content_key(model_name: str, template_version: str, normalized_input: str, **params: Any) -> str:
+    """Content-addressed key for an LLM response.
+
+    ``template_version`` is the calling service's ``PROMPT_VERSION``. Bump it
+    whenever that service's prompts change so cached responses are not reused.
+    """
+    payload = json.dumps(
+        [model_name, template_version, normalized_input, params],
+        sort_keys=True, default=str, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_llm_cache() -> TwoTierCache:
+    """Get the response cache shared by all Gemini-backed services"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = TwoTierCache(
+            "llm_responses",
+            max_memory_items=int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "512")),
+            max_disk_items=int(os.getenv("LLM_CACHE_DISK_ITEMS", "20000")),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+        )
+    return _llm_cache
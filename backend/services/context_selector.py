@@ -0,0 +1,144 @@
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.extractive_summarizer import tfidf_vectors
+from services.metrics import CONTEXT_TOKENS
+from services.request_timing import record_context, timed
+from services.transcript_index import tokenize
+
+# Placed between non-adjacent windows so the model knows text was skipped
+GAP_MARKER = "\n[...]\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of text (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def context_heading(selection: Dict[str, Any]) -> str:
+    """Heading for the transcript section of a prompt"""
+    if selection["trimmed"]:
+        return "Transcript excerpts (in video order, [...] marks skipped parts)"
+    return "Transcript"
+
+
+class ContextSelector:
+    """Picks the transcript passages a prompt can afford.
+
+    The transcript is cut into fixed-size word windows, each scored by
+    salience: cosine similarity of its TF-IDF vector to the whole video's
+    centroid, weighted by the share of content words so filler and small
+    talk score low. The timeline is split into as many strata as the budget
+    holds windows and the best window of each stratum is kept, so the whole
+    video is covered rather than its first minutes; leftover budget goes to
+    the best windows overall. Windows are returned in video order.
+    """
+
+    def __init__(self, window_words: Optional[int] = None):
+        self.window_words = window_words or int(os.getenv('CONTEXT_WINDOW_WORDS', '80'))
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "trimmed": 0, "input_tokens": 0, "context_tokens": 0}
+        )
+
+    @timed("context_select")
+    def select(self, text: str, budget_tokens: int, purpose: str = "default") -> Dict[str, Any]:
+        """Return the most salient windows of text that fit budget_tokens.
+
+        The result holds the selected ``text``, its estimated ``tokens``,
+        the ``input_tokens`` of the full transcript, whether it was
+        ``trimmed`` and how many windows were kept out of how many.
+        """
+        input_tokens = estimate_tokens(text)
+        if input_tokens <= budget_tokens:
+            selection = {"text": text, "tokens": input_tokens, "input_tokens": input_tokens,
+                         "trimmed": False, "windows": 1, "windows_total": 1}
+        else:
+            selection = self._select_windows(text, budget_tokens, input_tokens)
+
+        with self._lock:
+            stats = self._stats[purpose]
+            stats["calls"] += 1
+            stats["trimmed"] += selection["trimmed"]
+            stats["input_tokens"] += input_tokens
+            stats["context_tokens"] += selection["tokens"]
+        # Per call: a histogram for dashboards and an entry in the request's timing log line
+        CONTEXT_TOKENS.labels(purpose, "input").observe(input_tokens)
+        CONTEXT_TOKENS.labels(purpose, "sent").observe(selection["tokens"])
+        record_context(purpose, input_tokens, selection["tokens"])
+        return selection
+
+    def _select_windows(self, text: str, budget_tokens: int, input_tokens: int) -> Dict[str, Any]:
+        words = text.split()
+        windows = [' '.join(words[start:start + self.window_words])
+                   for start in range(0, len(words), self.window_words)]
+        # Every window may need a gap marker in front of it
+        costs = np.array([estimate_tokens(window) for window in windows]) + estimate_tokens(GAP_MARKER)
+        scores = self._salience(windows)
+
+        num_strata = int(min(len(windows), max(1, budget_tokens // costs.mean())))
+        bounds = np.linspace(0, len(windows), num_strata + 1).round().astype(int)
+
+        chosen = np.zeros(len(windows), dtype=bool)
+        remaining = budget_tokens
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end <= start:
+                continue
+            best = start + int(np.argmax(scores[start:end]))
+            if costs[best] <= remaining:
+                chosen[best] = True
+                remaining -= costs[best]
+
+        # Spend what the strata left over on the best windows anywhere
+        for index in np.argsort(-scores, kind="stable"):
+            if not chosen[index] and costs[index] <= remaining:
+                chosen[index] = True
+                remaining -= costs[index]
+
+        selected = np.flatnonzero(chosen)
+        parts: List[str] = []
+        previous = -1
+        for index in selected:
+            if parts:
+                parts.append(' ' if index == previous + 1 else GAP_MARKER)
+            parts.append(windows[index])
+            previous = index
+
+        context = ''.join(parts)
+        return {"text": context, "tokens": estimate_tokens(context), "input_tokens": input_tokens,
+                "trimmed": True, "windows": len(selected), "windows_total": len(windows)}
+
+    def _salience(self, windows: List[str]) -> np.ndarray:
+        """Centroid similarity times content-word density for each window"""
+        vectors = tfidf_vectors(windows)
+        centroid = vectors.sum(axis=0)
+        norm = np.linalg.norm(centroid)
+        if norm == 0:
+            # No term appears twice; fall back to pure density
+            centrality = np.ones(len(windows), dtype=np.float32)
+        else:
+            centrality = vectors @ (centroid / norm)
+
+        density = np.array([len(tokenize(window)) / max(1, len(window.split())) for window in windows],
+                           dtype=np.float32)
+        return centrality * density
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Transcript tokens in and context tokens out, per purpose"""
+        with self._lock:
+            return {purpose: dict(stats) for purpose, stats in self._stats.items()}
+
+
+_selector = None
+
+
+def get_context_selector() -> ContextSelector:
+    """Get the context selector shared by all prompt builders"""
+    global _selector
+    if _selector is None:
+        _selector = ContextSelector()
+    return _selector
@@ -0,0 +1,112 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from services.metrics import EXECUTOR_ACTIVE_WORKERS, EXECUTOR_QUEUE_DEPTH
+
+# Pool sizes come from the environment; each kind of blocking work gets its own
+# pool so a burst of slow Gemini calls cannot starve transcript fetches.
+POOL_SIZES = {
+    "network": int(os.getenv("EXECUTOR_NETWORK_WORKERS", "16")),
+    "llm": int(os.getenv("EXECUTOR_LLM_WORKERS", "16")),
+    "cpu": int(os.getenv("EXECUTOR_CPU_WORKERS", str(os.cpu_count() or 2))),
+    # SQLite reads, writes and fsyncs, kept apart so disk latency cannot stall CPU work
+    "disk": int(os.getenv("EXECUTOR_DISK_WORKERS", "4")),
+}
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that tracks queue depth, active workers and wait time"""
+
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self.name = name
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recent_waits = deque(maxlen=500)
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        enqueued_at = time.monotonic()
+        with self._lock:
+            self._queued += 1
+
+        def run():
+            waited = time.monotonic() - enqueued_at
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                self._recent_waits.append(waited)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        return super().submit(run)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, active workers and wait time figures"""
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "active_workers": self._active,
+                "completed": self._completed,
+                "wait_avg_seconds": round(self._wait_total / self._completed, 4) if self._completed else 0.0,
+                "wait_p95_seconds": round(recent[int(0.95 * (len(recent) - 1))], 4) if recent else 0.0,
+                "wait_max_seconds": round(self._wait_max, 4),
+            }
+
+
+_executors: Dict[str, InstrumentedExecutor] = {}
+
+
+def get_executor(pool: str) -> InstrumentedExecutor:
+    """Get the named pool ("network", "llm", "cpu" or "disk"), creating it on first use"""
+    if pool not in POOL_SIZES:
+        raise ValueError(f"Unknown executor pool: {pool}")
+    if pool not in _executors:
+        executor = InstrumentedExecutor(pool, POOL_SIZES[pool])
+        # Read at scrape time so the gauges never go stale
+        EXECUTOR_QUEUE_DEPTH.labels(pool).set_function(lambda: executor._queued)
+        EXECUTOR_ACTIVE_WORKERS.labels(pool).set_function(lambda: executor._active)
+        _executors[pool] = executor
+    return _executors[pool]
+
+
+def submit_to_pool(pool: str, func: Callable, *args: Any, **kwargs: Any) -> Future:
+    """Start a blocking call on the named pool, returning its concurrent future"""
+    # Carry context variables (such as the request's stage timings) into the worker thread
+    context = contextvars.copy_context()
+    return get_executor(pool).submit(context.run, func, *args, **kwargs)
+
+
+async def run_in_pool(pool: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking call on the named pool and await its result"""
+    return await asyncio.wrap_future(submit_to_pool(pool, func, *args, **kwargs))
+
+
+def get_executor_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for every configured pool"""
+    return {pool: get_executor(pool).stats() for pool in POOL_SIZES}
+
+
+def shutdown_executors():
+    """Shut down all pools without waiting for queued work"""
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
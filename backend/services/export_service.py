@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict
+
+from services.cache_service import ArtifactCache
+from services.file_service import FileService
+from services.render_pool import RenderPool
+
+EXPORT_FORMATS = {
+    "pdf": {
+        "media_type": "application/pdf",
+        "extension": "pdf",
+    },
+    "docx": {
+        "media_type": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "extension": "docx",
+    },
+}
+
+# FileService generator for each (content kind, format)
+EXPORT_METHODS = {
+    ("summary", "pdf"): "generate_pdf",
+    ("summary", "docx"): "generate_doc",
+    ("flashcards", "pdf"): "generate_flashcards_pdf",
+    ("flashcards", "docx"): "generate_flashcards_doc",
+    ("quiz", "pdf"): "generate_quiz_pdf",
+    ("quiz", "docx"): "generate_quiz_doc",
+}
+
+
+class ExportService:
+    """Render exports in memory, cached by a hash of their content"""
+
+    def __init__(self, render_pool: RenderPool):
+        self.render_pool = render_pool
+        self.cache = ArtifactCache(int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+
+    async def export(self, export_format: str, video_title: str, data: Any, kind: str = "summary") -> bytes:
+        """Render (or fetch from cache) a summary, flashcards or quiz document"""
+        method = EXPORT_METHODS.get((kind, export_format))
+        if method is None:
+            raise ValueError(f"Unsupported export: {kind} as {export_format}")
+
+        key = self._cache_key(kind, export_format, video_title, data)
+        content = self.cache.get(key)
+        if content is None:
+            content = await self.render_pool.render(method, video_title, data)
+            self.cache.set(key, content)
+        return content
+
+    def _cache_key(self, kind: str, export_format: str, video_title: str, data: Any) -> str:
+        """Hash of (title, content, format, template version).
+
+        FileService.TEMPLATE_VERSION is bumped whenever the document layout
+        changes, so exports cached under the old layout are not reused.
+        """
+        payload = json.dumps(
+            [video_title, data, kind, export_format, FileService.TEMPLATE_VERSION],
+            sort_keys=True, default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return export cache statistics"""
+        return self.cache.stats()
@@ -0,0 +1,126 @@
+import re
+from typing import Dict, List
+
+import numpy as np
+
+from services.transcript_index import tokenize
+
+SENTENCE_END_PATTERN = re.compile(r'(?<=[.!?])\s+')
+
+
+def tfidf_vectors(texts: List[str], max_features: int = 2048) -> np.ndarray:
+    """L2-normalised TF-IDF rows over the terms shared by at least two texts"""
+    vocabulary: Dict[str, int] = {}
+    rows: List[int] = []
+    columns: List[int] = []
+    for row, text in enumerate(texts):
+        for token in tokenize(text):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    num_texts = len(texts)
+    counts = np.zeros((num_texts, len(vocabulary)), dtype=np.float32)
+    np.add.at(counts, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1.0)
+
+    document_frequency = np.count_nonzero(counts, axis=0)
+    # Terms in a single text add nothing to similarity; keep the most shared ones
+    shared = np.flatnonzero(document_frequency > 1)
+    if len(shared) > max_features:
+        shared = shared[np.argsort(-document_frequency[shared], kind="stable")[:max_features]]
+    counts = counts[:, shared]
+    document_frequency = document_frequency[shared]
+
+    idf = np.log((1 + num_texts) / (1 + document_frequency)).astype(np.float32) + 1.0
+    vectors = counts * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class ExtractiveSummarizer:
+    """Local summarizer that picks representative transcript sentences.
+
+    Sentences are embedded as TF-IDF vectors, ranked with TextRank over their
+    cosine similarity graph and chosen with maximal marginal relevance so the
+    points do not repeat each other. Runs in milliseconds on hour-long
+    transcripts and needs no network access.
+    """
+
+    def __init__(self, max_sentence_words: int = 30, min_sentence_words: int = 6, max_features: int = 2048,
+                 damping: float = 0.85, diversity: float = 0.3):
+        self.max_sentence_words = max_sentence_words
+        self.min_sentence_words = min_sentence_words
+        self.max_features = max_features
+        self.damping = damping
+        self.diversity = diversity
+
+    def summarize(self, text: str, num_points: int = 8) -> List[Dict[str, str]]:
+        """Return up to num_points bullet points in transcript order"""
+        sentences = self.split_sentences(text)
+        if not sentences:
+            return []
+
+        if len(sentences) <= num_points:
+            selected = list(range(len(sentences)))
+        else:
+            similarity = self._similarity_matrix(sentences)
+            scores = self._textrank(similarity)
+            selected = sorted(self._select_mmr(scores, similarity, num_points))
+
+        return [{"point": self._format_point(sentences[i]), "section": "Summary"} for i in selected]
+
+    def split_sentences(self, text: str) -> List[str]:
+        """Split on sentence punctuation; unpunctuated auto-captions are cut into even word windows"""
+        sentences = []
+        for sentence in SENTENCE_END_PATTERN.split(text):
+            words = sentence.split()
+            if len(words) < self.min_sentence_words:
+                continue
+            pieces = -(-len(words) // self.max_sentence_words)
+            size = -(-len(words) // pieces)
+            for start in range(0, len(words), size):
+                piece = words[start:start + size]
+                if len(piece) >= self.min_sentence_words:
+                    sentences.append(' '.join(piece))
+        return sentences
+
+    def _similarity_matrix(self, sentences: List[str]) -> np.ndarray:
+        """Cosine similarity of the sentences' TF-IDF vectors, zero on the diagonal"""
+        vectors = tfidf_vectors(sentences, self.max_features)
+        similarity = vectors @ vectors.T
+        np.fill_diagonal(similarity, 0.0)
+        return similarity
+
+    def _textrank(self, similarity: np.ndarray, iterations: int = 50, tolerance: float = 1e-6) -> np.ndarray:
+        """PageRank over the weighted sentence graph"""
+        num_sentences = similarity.shape[0]
+        out_weight = similarity.sum(axis=1, keepdims=True)
+        # Sentences sharing no terms with any other spread their rank evenly
+        transition = np.where(out_weight > 0, similarity / np.where(out_weight > 0, out_weight, 1.0),
+                              1.0 / num_sentences).astype(np.float32)
+
+        scores = np.full(num_sentences, 1.0 / num_sentences, dtype=np.float32)
+        for _ in range(iterations):
+            updated = (1 - self.damping) / num_sentences + self.damping * (transition.T @ scores)
+            if np.abs(updated - scores).sum() < tolerance:
+                return updated
+            scores = updated
+        return scores
+
+    def _select_mmr(self, scores: np.ndarray, similarity: np.ndarray, num_points: int) -> List[int]:
+        """Greedy maximal marginal relevance: high rank, low overlap with points already chosen"""
+        relevance = scores / scores.max()
+        redundancy = np.zeros_like(relevance)
+        available = np.ones(len(relevance), dtype=bool)
+        selected = []
+        for _ in range(num_points):
+            marginal = (1 - self.diversity) * relevance - self.diversity * redundancy
+            marginal[~available] = -np.inf
+            best = int(np.argmax(marginal))
+            selected.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, similarity[best])
+        return selected
+
+    def _format_point(self, sentence: str) -> str:
+        sentence = sentence.strip()
+        return sentence[0].upper() + sentence[1:]
@@ -1,5 +1,4 @@
-import os
-import tempfile
+import io
 from datetime import datetime
 from typing import List, Dict
 from reportlab.lib.pagesizes import letter, A4
@@ -10,71 +9,87 @@ from reportlab.lib.enums import TA_LEFT, TA_CENTER
 from docx import Document
 from docx.shared import Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from xml.sax.saxutils import escape
 
-class FileService:
-    def __init__(self):
-        self.temp_dir = tempfile.gettempdir()
+_pdf_styles = None
 
-    def generate_pdf(self, video_title: str, summary_data: List[Dict[str, str]]) -> str:
-        """Generate PDF file with video summary"""
-        # Create temporary file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"summary_{timestamp}.pdf"
-        filepath = os.path.join(self.temp_dir, filename)
+def get_pdf_styles() -> Dict[str, ParagraphStyle]:
+    """Build the PDF paragraph styles once per process and reuse them"""
+    global _pdf_styles
+    if _pdf_styles is None:
+        styles = getSampleStyleSheet()
 
-        # Create PDF document
-        doc = SimpleDocTemplate(
-            filepath,
-            pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18
-        )
+        _pdf_styles = {
+            'normal': styles['Normal'],
+            'title': ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Heading1'],
+                fontSize=18,
+                spaceAfter=30,
+                alignment=TA_CENTER,
+                textColor='#2563eb'
+            ),
+            'heading': ParagraphStyle(
+                'CustomHeading',
+                parent=styles['Heading2'],
+                fontSize=14,
+                spaceAfter=12,
+                spaceBefore=20,
+                textColor='#1f2937'
+            ),
+            'bullet': ParagraphStyle(
+                'BulletPoint',
+                parent=styles['Normal'],
+                fontSize=11,
+                spaceAfter=8,
+                leftIndent=20,
+                bulletIndent=10,
+                bulletFontName='Symbol'
+            ),
+            'footer': ParagraphStyle(
+                'Footer',
+                parent=styles['Normal'],
+                fontSize=9,
+                alignment=TA_CENTER,
+                textColor='#6b7280'
+            ),
+        }
+    return _pdf_styles
 
-        # Get styles
-        styles = getSampleStyleSheet()
+class FileService:
+    TEMPLATE_VERSION = "2"
 
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor='#2563eb'
-        )
+    def generate_pdf(self, video_title: str, summary_data: List[Dict[str, str]]) -> bytes:
+        """Generate PDF file with video summary"""
+        pdf_styles = get_pdf_styles()
+        story = []
 
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=20,
-            textColor='#1f2937'
-        )
+        # Summary content
+        if summary_data:
+            current_section = None
 
-        bullet_style = ParagraphStyle(
-            'BulletPoint',
-            parent=styles['Normal'],
-            fontSize=11,
-            spaceAfter=8,
-            leftIndent=20,
-            bulletIndent=10,
-            bulletFontName='Symbol'
-        )
+            for item in summary_data:
+                section = item.get('section', 'Summary')
+                point = item.get('point', '')
 
-        # Build content
-        story = []
+                # Add section heading if it's a new section
+                if section != current_section:
+                    if current_section is not None:
+                        story.append(Spacer(1, 12))
+                    story.append(Paragraph(escape(section), pdf_styles['heading']))
+                    current_section = section
 
-        # Title
-        story.append(Paragraph(f"Video Summary: {video_title}", title_style))
-        story.append(Spacer(1, 12))
+                # Add bullet point
+                if point:
+                    story.append(Paragraph(f"• {escape(point)}", pdf_styles['bullet']))
+        else:
+            story.append(Paragraph("No summary available.", pdf_styles['normal']))
 
-        # Generated date
-        date_str = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-        story.append(Paragraph(f"Generated on {date_str}", styles['Normal']))
-        story.append(Spacer(1, 20))
+        return self._build_pdf(f"Video Summary: {video_title}", story)
+
+    def generate_doc(self, video_title: str, summary_data: List[Dict[str, str]]) -> bytes:
+        """Generate DOC file with video summary"""
+        doc = self._new_doc(f'Video Summary: {video_title}')
 
         # Summary content
         if summary_data:
@@ -87,53 +102,152 @@ class FileService:
                 # Add section heading if it's a new section
                 if section != current_section:
                     if current_section is not None:
-                        story.append(Spacer(1, 12))
-                    story.append(Paragraph(section, heading_style))
+                        doc.add_paragraph()  # Add spacing
+                    doc.add_heading(section, level=1)
                     current_section = section
 
                 # Add bullet point
                 if point:
-                    bullet_text = f"• {point}"
-                    story.append(Paragraph(bullet_text, bullet_style))
+                    bullet_para = doc.add_paragraph()
+                    bullet_para.style = 'List Bullet'
+                    bullet_para.add_run(point)
+        else:
+            doc.add_paragraph("No summary available.")
+
+        return self._save_doc(doc)
+
+    def generate_flashcards_pdf(self, video_title: str, flashcards: List[Dict[str, str]]) -> bytes:
+        """Generate PDF file with flashcards"""
+        pdf_styles = get_pdf_styles()
+        story = []
+
+        if flashcards:
+            for index, card in enumerate(flashcards, 1):
+                category = card.get('category', '')
+                heading = f"Card {index}" + (f" ({category})" if category else "")
+                story.append(Paragraph(escape(heading), pdf_styles['heading']))
+                story.append(Paragraph(f"<b>Q:</b> {escape(card.get('question', ''))}", pdf_styles['bullet']))
+                story.append(Paragraph(f"<b>A:</b> {escape(card.get('answer', ''))}", pdf_styles['bullet']))
+        else:
+            story.append(Paragraph("No flashcards available.", pdf_styles['normal']))
+
+        return self._build_pdf(f"Flashcards: {video_title}", story)
+
+    def generate_flashcards_doc(self, video_title: str, flashcards: List[Dict[str, str]]) -> bytes:
+        """Generate DOC file with flashcards"""
+        doc = self._new_doc(f'Flashcards: {video_title}')
+
+        if flashcards:
+            for index, card in enumerate(flashcards, 1):
+                category = card.get('category', '')
+                doc.add_heading(f"Card {index}" + (f" ({category})" if category else ""), level=1)
+                question = doc.add_paragraph()
+                question.add_run("Q: ").bold = True
+                question.add_run(card.get('question', ''))
+                answer = doc.add_paragraph()
+                answer.add_run("A: ").bold = True
+                answer.add_run(card.get('answer', ''))
+        else:
+            doc.add_paragraph("No flashcards available.")
+
+        return self._save_doc(doc)
+
+    def generate_quiz_pdf(self, video_title: str, quiz: Dict) -> bytes:
+        """Generate PDF file with quiz questions followed by an answer key"""
+        pdf_styles = get_pdf_styles()
+        story = []
+        questions = (quiz or {}).get('questions', [])
+
+        if questions:
+            for index, question in enumerate(questions, 1):
+                story.append(Paragraph(f"{index}. {escape(question.get('question', ''))}", pdf_styles['heading']))
+                for option_key, option in (question.get('options') or {}).items():
+                    story.append(Paragraph(f"{escape(option_key)}) {escape(str(option))}", pdf_styles['bullet']))
+
+            story.append(Paragraph("Answer Key", pdf_styles['heading']))
+            for index, question in enumerate(questions, 1):
+                answer = f"{index}. {question.get('correct_answer', '')}"
+                if question.get('explanation'):
+                    answer += f" - {question['explanation']}"
+                story.append(Paragraph(escape(answer), pdf_styles['bullet']))
+        else:
+            story.append(Paragraph("No quiz questions available.", pdf_styles['normal']))
+
+        title = (quiz or {}).get('title') or f"{video_title} - Quiz"
+        return self._build_pdf(f"Quiz: {title}", story)
+
+    def generate_quiz_doc(self, video_title: str, quiz: Dict) -> bytes:
+        """Generate DOC file with quiz questions followed by an answer key"""
+        title = (quiz or {}).get('title') or f"{video_title} - Quiz"
+        doc = self._new_doc(f'Quiz: {title}')
+        questions = (quiz or {}).get('questions', [])
+
+        if questions:
+            for index, question in enumerate(questions, 1):
+                doc.add_heading(f"{index}. {question.get('question', '')}", level=2)
+                for option_key, option in (question.get('options') or {}).items():
+                    doc.add_paragraph(f"{option_key}) {option}")
+
+            doc.add_heading("Answer Key", level=1)
+            for index, question in enumerate(questions, 1):
+                answer = f"{index}. {question.get('correct_answer', '')}"
+                if question.get('explanation'):
+                    answer += f" - {question['explanation']}"
+                doc.add_paragraph(answer)
         else:
-            story.append(Paragraph("No summary available.", styles['Normal']))
+            doc.add_paragraph("No quiz questions available.")
+
+        return self._save_doc(doc)
+
+    def _build_pdf(self, heading: str, content: List) -> bytes:
+        """Wrap content with the title, date and footer and render it into memory"""
+        buffer = io.BytesIO()
+
+        # Create PDF document
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=18
+        )
+
+        # Get styles (built once per process)
+        pdf_styles = get_pdf_styles()
+
+        # Title
+        story = [Paragraph(escape(heading), pdf_styles['title']), Spacer(1, 12)]
+
+        # Generated date
+        date_str = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+        story.append(Paragraph(f"Generated on {date_str}", pdf_styles['normal']))
+        story.append(Spacer(1, 20))
+
+        story.extend(content)
 
         # Footer
         story.append(Spacer(1, 30))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=9,
-            alignment=TA_CENTER,
-            textColor='#6b7280'
-        )
-        story.append(Paragraph("Generated by You Learn - YouTube Video Summarizer", footer_style))
+        story.append(Paragraph("Generated by You Learn - YouTube Video Summarizer", pdf_styles['footer']))
 
         # Build PDF
         doc.build(story)
 
-        return filepath
-
-    def generate_doc(self, video_title: str, summary_data: List[Dict[str, str]]) -> str:
-        """Generate DOC file with video summary"""
-        # Create temporary file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"summary_{timestamp}.docx"
-        filepath = os.path.join(self.temp_dir, filename)
+        return buffer.getvalue()
 
-        # Create document
+    def _new_doc(self, heading: str):
+        """Create a document with margins, title and generated date"""
         doc = Document()
 
         # Set document margins
-        sections = doc.sections
-        for section in sections:
+        for section in doc.sections:
             section.top_margin = Inches(1)
             section.bottom_margin = Inches(1)
             section.left_margin = Inches(1)
             section.right_margin = Inches(1)
 
         # Title
-        title = doc.add_heading(f'Video Summary: {video_title}', 0)
+        title = doc.add_heading(heading, 0)
         title.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
         # Generated date
@@ -144,43 +258,15 @@ class FileService:
         # Add spacing
         doc.add_paragraph()
 
-        # Summary content
-        if summary_data:
-            current_section = None
-
-            for item in summary_data:
-                section = item.get('section', 'Summary')
-                point = item.get('point', '')
-
-                # Add section heading if it's a new section
-                if section != current_section:
-                    if current_section is not None:
-                        doc.add_paragraph()  # Add spacing
-                    doc.add_heading(section, level=1)
-                    current_section = section
-
-                # Add bullet point
-                if point:
-                    bullet_para = doc.add_paragraph()
-                    bullet_para.style = 'List Bullet'
-                    bullet_para.add_run(point)
-        else:
-            doc.add_paragraph("No summary available.")
+        return doc
 
-        # Footer
+    def _save_doc(self, doc) -> bytes:
+        """Add the footer and save the document into memory"""
         doc.add_paragraph()
         footer = doc.add_paragraph("Generated by You Learn - YouTube Video Summarizer")
         footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
-        # Save document
-        doc.save(filepath)
-
-        return filepath
+        buffer = io.BytesIO()
+        doc.save(buffer)
 
-    def cleanup_file(self, filepath: str):
-        """Clean up temporary file"""
-        try:
-            if os.path.exists(filepath):
-                os.remove(filepath)
-        except Exception as e:
-            print(f"Error cleaning up file {filepath}: {e}")
\ No newline at end of file
+        return buffer.getvalue()
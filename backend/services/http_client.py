@@ -0,0 +1,33 @@
+import os
+from typing import Optional
+
+import httpx
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared, pooled async HTTP client (created on first use)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                float(os.getenv("HTTP_TIMEOUT_SECONDS", "10")),
+                connect=float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5")),
+            ),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "50")),
+                max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+                keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")),
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_http_client():
+    """Close the shared HTTP client and release pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
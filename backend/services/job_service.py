@@ -0,0 +1,283 @@
+import asyncio
+import inspect
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from services.executors import run_in_pool
+
+DEFAULT_JOB_DB_PATH = os.path.join(tempfile.gettempdir(), "you_learn_jobs.db")
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+# Listings leave out params, which can hold whole transcripts
+LIST_COLUMNS = "id, kind, status, progress, error, attempts, created_at, updated_at"
+
+
+class JobStore:
+    """SQLite table holding every job's parameters, progress and result"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("JOB_DB_PATH", DEFAULT_JOB_DB_PATH)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Job state changes are rare and must survive a crash
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                progress TEXT,
+                result TEXT,
+                result_blob BLOB,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    def create(self, kind: str, params: Dict[str, Any]) -> str:
+        """Insert a queued job and return its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(params), now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields: Any):
+        """Set columns on a job; progress and result are stored as JSON"""
+        for column in ("progress", "result"):
+            if column in fields and fields[column] is not None:
+                fields[column] = json.dumps(fields[column])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str, with_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Return a job as a dict, or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row, with_result) if row is not None else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally filtered by status (without params)"""
+        query = f"SELECT {LIST_COLUMNS} FROM jobs"
+        args: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*args, limit)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs that were queued or running, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", ACTIVE_STATUSES
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs last updated before older_than"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?, ?) AND updated_at < ?", (*FINISHED_STATUSES, older_than)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def _to_dict(self, row: sqlite3.Row, with_result: bool = False) -> Dict[str, Any]:
+        job = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "progress": json.loads(row["progress"]) if row["progress"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+        if "params" in row.keys():
+            job["params"] = json.loads(row["params"])
+        if with_result:
+            job["result"] = row["result_blob"] if row["result_blob"] is not None else (
+                json.loads(row["result"]) if row["result"] else None
+            )
+        return job
+
+
+class JobService:
+    """Runs registered service methods as background jobs persisted in SQLite.
+
+    Any async service method can be registered as a job kind; job parameters
+    are passed to it as keyword arguments. Methods returning async iterators
+    have their progress recorded at most every JOB_PROGRESS_INTERVAL_SECONDS.
+    Store reads and writes (fsynced SQLite commits) run on the disk pool
+    rather than the event loop. Jobs left queued or running by a crash or
+    restart are picked up again by ``resume()``.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None):
+        self.store = store or JobStore()
+        self.max_concurrency = int(os.getenv('JOB_MAX_CONCURRENCY', '4'))
+        self.max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+        self.retention_seconds = float(os.getenv('JOB_RETENTION_SECONDS', str(7 * 24 * 3600)))
+        self.progress_interval = float(os.getenv('JOB_PROGRESS_INTERVAL_SECONDS', '1'))
+
+        self._kinds: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._shutting_down = False
+
+    def register(self, kind: str, func: Callable, media_type: Optional[Callable[[Dict], str]] = None):
+        """Make func available as a job kind; media_type(params) labels byte results"""
+        self._kinds[kind] = {"func": func, "media_type": media_type}
+
+    def kinds(self) -> List[str]:
+        return list(self._kinds)
+
+    def media_type(self, job: Dict[str, Any]) -> str:
+        """Content type for a job's byte result"""
+        media_type = self._kinds.get(job["kind"], {}).get("media_type")
+        return media_type(job["params"]) if media_type else "application/octet-stream"
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Persist a new job and start it in the background"""
+        if kind not in self._kinds:
+            raise ValueError(f"Unknown job kind: {kind}. Choose from: {', '.join(self._kinds)}")
+        try:
+            inspect.signature(self._kinds[kind]["func"]).bind(**params)
+        except TypeError as e:
+            raise ValueError(f"Invalid parameters for {kind}: {e}")
+
+        job_id = await run_in_pool("disk", self.store.create, kind, params)
+        self._start(job_id, kind, params)
+        return await run_in_pool("disk", self.store.get, job_id)
+
+    def resume(self) -> int:
+        """Restart jobs interrupted by a crash or shutdown; call once at startup"""
+        self._shutting_down = False
+        self.store.purge(time.time() - self.retention_seconds)
+
+        resumed = 0
+        for job in self.store.unfinished():
+            if job["job_id"] in self._tasks:
+                continue
+            if job["kind"] not in self._kinds:
+                self.store.update(job["job_id"], status="failed", error=f"Unknown job kind: {job['kind']}")
+            elif job["attempts"] >= self.max_attempts:
+                self.store.update(job["job_id"], status="failed", error="Interrupted too many times")
+            else:
+                self.store.update(job["job_id"], status="queued")
+                self._start(job["job_id"], job["kind"], job["params"])
+                resumed += 1
+        return resumed
+
+    def _start(self, job_id: str, kind: str, params: Dict[str, Any]):
+        task = asyncio.ensure_future(self._run(job_id, kind, params))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str, kind: str, params: Dict[str, Any]):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        try:
+            async with self._semaphore:
+                job = await run_in_pool("disk", self.store.get, job_id)
+                await self._update(job_id, status="running", attempts=job["attempts"] + 1)
+
+                output = self._kinds[kind]["func"](**params)
+                progress = None
+                if inspect.isasyncgen(output) or hasattr(output, "__aiter__"):
+                    items = []
+                    written_at = time.monotonic()
+                    async for item in output:
+                        items.append(item)
+                        progress = {"items_done": len(items)}
+                        # Each write is an fsync, so progress is throttled rather than written per item
+                        if time.monotonic() - written_at >= self.progress_interval:
+                            await self._update(job_id, progress=progress)
+                            written_at = time.monotonic()
+                    result = items
+                else:
+                    result = await output
+
+            if isinstance(result, bytes):
+                await self._update(job_id, status="completed", result_blob=result)
+            else:
+                await self._update(job_id, status="completed", result=result, progress=progress)
+        except asyncio.CancelledError:
+            # Jobs stopped by shutdown stay active so resume() restarts them
+            if not self._shutting_down:
+                await self._update(job_id, status="cancelled")
+            raise
+        except Exception as e:
+            print(f"Error running {kind} job {job_id}: {e}")
+            await self._update(job_id, status="failed", error=str(e))
+
+    async def _update(self, job_id: str, **fields: Any):
+        await run_in_pool("disk", self.store.update, job_id, **fields)
+
+    async def get(self, job_id: str, with_result: bool = False) -> Dict[str, Any]:
+        """Return a job, raising KeyError if it does not exist"""
+        job = await run_in_pool("disk", self.store.get, job_id, with_result)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        return job
+
+    async def cancel(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a queued or running job"""
+        job = await self.get(job_id)
+        if job["status"] in ACTIVE_STATUSES:
+            await self._update(job_id, status="cancelled")
+            task = self._tasks.get(job_id)
+            if task is not None:
+                task.cancel()
+        return await self.get(job_id)
+
+    async def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        return await run_in_pool("disk", self.store.list, status, limit)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Jobs per status and how many run in this process"""
+        return {"by_status": await run_in_pool("disk", self.store.counts), "running_here": len(self._tasks)}
+
+    def shutdown(self):
+        """Stop running jobs without marking them cancelled, so they resume on restart"""
+        self._shutting_down = True
+        for task in list(self._tasks.values()):
+            task.cancel()
@@ -0,0 +1,352 @@
+import asyncio
+import os
+import random
+import time
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, Optional
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from dotenv import load_dotenv
+
+from services.context_selector import estimate_tokens
+from services.executors import submit_to_pool
+from services.metrics import GEMINI_CALL_SECONDS, GEMINI_TOKENS
+from services.request_timing import record as record_stage
+
+load_dotenv()
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``rate`` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.waiting = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self):
+        """Wait until a token is available, then take it"""
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while not self.try_acquire():
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+
+class LLMGateway:
+    """Single entry point for Gemini calls shared by every service.
+
+    Services never call Gemini directly; all traffic goes through this
+    gateway so one rate limit and concurrency cap covers every caller.
+
+    Applies a token-bucket rate limit matched to the API quota, a global
+    concurrency cap, per-call deadlines, exponential backoff on 429/5xx and
+    optional hedging: when a call runs past the recent p95 latency a
+    duplicate is fired and the first answer wins.
+    """
+
+    def __init__(self):
+        self.api_key = os.getenv('GEMINI_API_KEY')
+        self.model_name = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+        if self.api_key:
+            genai.configure(api_key=self.api_key)
+            self.model = genai.GenerativeModel(self.model_name)
+        else:
+            self.model = None
+
+        requests_per_minute = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', '15'))
+        self.rate_limiter = TokenBucket(
+            rate=requests_per_minute / 60,
+            capacity=float(os.getenv('GEMINI_BURST', str(max(1, int(requests_per_minute // 4))))),
+        )
+        self.max_concurrency = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.call_timeout = float(os.getenv('GEMINI_CALL_TIMEOUT_SECONDS', '60'))
+        self.max_retries = int(os.getenv('GEMINI_MAX_RETRIES', '3'))
+        self.backoff_base = float(os.getenv('GEMINI_BACKOFF_BASE_SECONDS', '1'))
+        self.backoff_max = float(os.getenv('GEMINI_BACKOFF_MAX_SECONDS', '20'))
+
+        self.hedge_enabled = os.getenv('GEMINI_HEDGE_ENABLED', 'false').lower() == 'true'
+        self.hedge_min_samples = int(os.getenv('GEMINI_HEDGE_MIN_SAMPLES', '20'))
+        self._latencies = deque(maxlen=500)
+
+        # Load shedding: callers with a local fallback skip Gemini while saturated
+        self.degraded_mode = os.getenv('DEGRADED_MODE', 'false').lower() == 'true'
+        self.degrade_queue_depth = int(os.getenv('GEMINI_DEGRADE_QUEUE_DEPTH', '20'))
+        self.quota_cooldown = float(os.getenv('GEMINI_QUOTA_COOLDOWN_SECONDS', '60'))
+        self._quota_exhausted_until = 0.0
+
+        self._active = 0
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "quota_errors": 0,
+        }
+        self._service_calls: Dict[str, int] = defaultdict(int)
+        self._service_prompt_tokens: Dict[str, int] = defaultdict(int)
+
+    def is_configured(self) -> bool:
+        """Check if Gemini API is properly configured"""
+        return self.model is not None
+
+    async def generate(self, prompt: str, service: str = "default", timeout: Optional[float] = None,
+                       hedge: Optional[bool] = None) -> str:
+        """Generate text for prompt, with rate limiting, retries and optional hedging"""
+        if not self.is_configured():
+            raise Exception("Gemini API key not configured. Please set GEMINI_API_KEY environment variable.")
+
+        timeout = timeout or self.call_timeout
+        hedge = self.hedge_enabled if hedge is None else hedge
+        self._record_call(prompt, service)
+
+        start = time.monotonic()
+        try:
+            text = await self._generate_with_retries(prompt, timeout, hedge)
+        except Exception:
+            GEMINI_CALL_SECONDS.labels(service, "error").observe(time.monotonic() - start)
+            raise
+        finally:
+            record_stage("gemini", time.monotonic() - start)
+        GEMINI_CALL_SECONDS.labels(service, "ok").observe(time.monotonic() - start)
+        GEMINI_TOKENS.labels(service, "output").inc(estimate_tokens(text))
+        return text
+
+    async def _generate_with_retries(self, prompt: str, timeout: float, hedge: bool) -> str:
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            try:
+                return await self._attempt(prompt, timeout, hedge)
+            except Exception as e:
+                if self._status_code(e) == 429:
+                    self._stats["quota_errors"] += 1
+                    self._quota_exhausted_until = time.monotonic() + self.quota_cooldown
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    self._stats["failures"] += 1
+                    raise
+
+                self._stats["retries"] += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def generate_stream(self, prompt: str, service: str = "default") -> AsyncIterator[str]:
+        """Stream text fragments for prompt as Gemini produces them"""
+        if not self.is_configured():
+            raise Exception("Gemini API key not configured. Please set GEMINI_API_KEY environment variable.")
+
+        self._record_call(prompt, service)
+        start = time.monotonic()
+        outcome = "error"
+        await self.rate_limiter.acquire()
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        # Set when the consumer stops early so the producer thread stops reading chunks
+        abandoned = threading.Event()
+
+        def produce():
+            try:
+                response = self.model.generate_content(
+                    prompt, stream=True, request_options={"timeout": self.call_timeout}
+                )
+                for chunk in response:
+                    if abandoned.is_set():
+                        return
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        try:
+            await self._submit_holding_slot(produce)
+            while True:
+                item = await asyncio.wait_for(queue.get(), self.call_timeout)
+                if item is finished:
+                    outcome = "ok"
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                GEMINI_TOKENS.labels(service, "output").inc(estimate_tokens(item))
+                yield item
+        except Exception as e:
+            self._stats["failures"] += 1
+            if self._status_code(e) == 429:
+                self._stats["quota_errors"] += 1
+                self._quota_exhausted_until = time.monotonic() + self.quota_cooldown
+            raise
+        finally:
+            abandoned.set()
+            GEMINI_CALL_SECONDS.labels(service, outcome).observe(time.monotonic() - start)
+            record_stage("gemini", time.monotonic() - start)
+
+    async def _attempt(self, prompt: str, timeout: float, hedge: bool) -> str:
+        """One attempt, hedged with a duplicate call if it runs past p95"""
+        primary = asyncio.ensure_future(self._call(prompt, timeout))
+        threshold = self._hedge_threshold() if hedge else None
+        if threshold is None:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=threshold)
+            if done:
+                return primary.result()
+
+            # Only hedge when it costs neither a queued slot nor a waited-for token
+            if self._semaphore.locked() or not self.rate_limiter.try_acquire():
+                return await primary
+
+            self._stats["hedged"] += 1
+            backup = asyncio.ensure_future(self._call(prompt, timeout))
+            pending.add(backup)
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, prompt: str, timeout: float) -> str:
+        """A single Gemini request bounded by the concurrency cap and deadline"""
+        future = await self._submit_holding_slot(
+            self.model.generate_content, prompt, request_options={"timeout": timeout}
+        )
+        start = time.monotonic()
+        try:
+            response = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            text = response.text
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise
+
+        self._latencies.append(time.monotonic() - start)
+        return text
+
+    async def _submit_holding_slot(self, func, *args, **kwargs) -> Future:
+        """Start func on the llm pool under the concurrency cap.
+
+        The slot is released when the worker thread returns rather than when
+        the caller stops waiting, so calls abandoned by a deadline or a
+        winning hedge still count against GEMINI_MAX_CONCURRENCY.
+        """
+        await self._semaphore.acquire()
+        self._active += 1
+        loop = asyncio.get_running_loop()
+
+        def release_slot():
+            self._active -= 1
+            self._semaphore.release()
+
+        def on_done(_: Future):
+            try:
+                loop.call_soon_threadsafe(release_slot)
+            except RuntimeError:
+                # The event loop is already closed during shutdown
+                pass
+
+        try:
+            future = submit_to_pool("llm", func, *args, **kwargs)
+        except BaseException:
+            release_slot()
+            raise
+        future.add_done_callback(on_done)
+        return future
+
+    def _record_call(self, prompt: str, service: str):
+        self._stats["calls"] += 1
+        self._service_calls[service] += 1
+        tokens = estimate_tokens(prompt)
+        self._service_prompt_tokens[service] += tokens
+        GEMINI_TOKENS.labels(service, "prompt").inc(tokens)
+
+    def is_saturated(self) -> bool:
+        """True in degraded mode, after a recent quota error or while too many calls wait for a token"""
+        if self.degraded_mode or time.monotonic() < self._quota_exhausted_until:
+            return True
+        return 0 < self.degrade_queue_depth <= self.rate_limiter.waiting
+
+    def _status_code(self, error: Exception) -> Optional[int]:
+        if isinstance(error, google_exceptions.GoogleAPICallError):
+            return error.code
+        return getattr(error, 'code', None)
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """Retry timeouts, rate limiting (429) and server errors (5xx)"""
+        if isinstance(error, asyncio.TimeoutError):
+            return True
+        return self._status_code(error) in RETRYABLE_STATUS_CODES
+
+    def _percentile(self, percentile: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+    def _hedge_threshold(self) -> Optional[float]:
+        """Recent p95 latency, once enough samples exist to trust it"""
+        if len(self._latencies) < self.hedge_min_samples:
+            return None
+        return self._percentile(0.95)
+
+    def stats(self) -> Dict:
+        """Return call counters, latency percentiles and limiter state"""
+        p50 = self._percentile(0.5)
+        p95 = self._percentile(0.95)
+        return {
+            **self._stats,
+            "active": self._active,
+            "tokens_available": round(self.rate_limiter.tokens, 2),
+            "waiting_for_token": self.rate_limiter.waiting,
+            "saturated": self.is_saturated(),
+            "latency_p50_seconds": round(p50, 3) if p50 is not None else None,
+            "latency_p95_seconds": round(p95, 3) if p95 is not None else None,
+            "calls_by_service": dict(self._service_calls),
+            "prompt_tokens_by_service": dict(self._service_prompt_tokens),
+        }
+
+
+_gateway = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get the gateway shared by all Gemini-backed services"""
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway()
+    return _gateway
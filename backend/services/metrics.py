@@ -0,0 +1,89 @@
+import time
+from typing import Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Upstream calls (Gemini, YouTube, document rendering) take seconds, not milliseconds
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request, including streamed bodies",
+    ["method", "endpoint", "status"], buckets=SLOW_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being served", ["method"],
+)
+
+GEMINI_CALL_SECONDS = Histogram(
+    "gemini_call_duration_seconds", "Gemini call latency per calling service, including retries and queueing",
+    ["service", "outcome"], buckets=SLOW_BUCKETS,
+)
+GEMINI_TOKENS = Counter(
+    "gemini_tokens", "Estimated Gemini tokens per calling service", ["service", "direction"],
+)
+
+CONTEXT_TOKENS = Histogram(
+    "prompt_context_tokens", "Estimated transcript tokens per prompt, before and after context selection",
+    ["purpose", "stage"], buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000),
+)
+
+TRANSCRIPT_FETCH_SECONDS = Histogram(
+    "transcript_fetch_duration_seconds", "Time to fetch and normalize a transcript from YouTube",
+    ["outcome"], buckets=SLOW_BUCKETS,
+)
+
+FALLBACKS = Counter(
+    "fallbacks", "Responses served by a fallback path instead of Gemini output", ["path", "reason"],
+)
+
+EXPORT_RENDER_SECONDS = Histogram(
+    "export_render_duration_seconds", "Document render time in the render pool", ["method", "outcome"],
+    buckets=SLOW_BUCKETS,
+)
+RENDER_POOL_PENDING = Gauge("render_pool_pending", "Export renders queued or running")
+
+EXECUTOR_QUEUE_DEPTH = Gauge("executor_queue_depth", "Tasks waiting for a worker thread", ["pool"])
+EXECUTOR_ACTIVE_WORKERS = Gauge("executor_active_workers", "Worker threads running a task", ["pool"])
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with their content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Records latency and in-flight counts for every HTTP request.
+
+    Requests are labelled with their route template (``/api/jobs/{job_id}``)
+    rather than the raw path so label cardinality stays bounded; paths that
+    match no route are grouped under ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        start = time.perf_counter()
+        # The route is only known once routing has run, so in-flight requests are counted per method
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(method, endpoint, str(status)).observe(time.perf_counter() - start)
@@ -0,0 +1,132 @@
+import heapq
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "you_learn_profiles")
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+UNSAFE_FILENAME_PATTERN = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class SamplingProfiler:
+    """Opt-in wall-clock sampler that writes folded stacks for slow requests.
+
+    While at least one profiled request is in flight, a background thread
+    samples the stack of every busy thread (the event loop and the worker
+    pools) every PROFILE_INTERVAL_MS. Samples are attributed to every
+    profiled request in flight, so profiles taken under concurrent traffic
+    also show other requests' work.
+
+    A request is profiled when it sends ``X-Profile: 1`` (only honoured
+    with PROFILE_ALLOW_HEADER=true) or is picked by PROFILE_SAMPLE_RATE.
+    Only the PROFILE_KEEP slowest profiles are kept in PROFILE_DIR as
+    ``.folded`` files, ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self):
+        self.sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+        self.allow_header = os.getenv('PROFILE_ALLOW_HEADER', 'false').lower() == 'true'
+        self.interval = float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000
+        self.keep = int(os.getenv('PROFILE_KEEP', '20'))
+        self.profile_dir = os.getenv('PROFILE_DIR', DEFAULT_PROFILE_DIR)
+
+        self._lock = threading.Lock()
+        self._active: List[Counter] = []
+        self._thread: Optional[threading.Thread] = None
+        # Min-heap of (seconds, path) so the fastest kept profile is evicted first
+        self._kept: List[Tuple[float, str]] = []
+
+    def start(self, headers: Headers) -> Optional[Counter]:
+        """Begin profiling a request if it opted in or was sampled; returns its sample counter"""
+        requested = self.allow_header and headers.get("x-profile") == "1"
+        if not requested and not (self.sample_rate > 0 and random.random() < self.sample_rate):
+            return None
+
+        samples: Counter = Counter()
+        with self._lock:
+            self._active.append(samples)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def finish(self, samples: Counter, label: str, seconds: float) -> Optional[str]:
+        """Stop profiling a request; write its folded stacks if it is among the slowest"""
+        with self._lock:
+            self._active.remove(samples)
+            if not samples:
+                return None
+            if len(self._kept) >= self.keep and seconds <= self._kept[0][0]:
+                return None
+
+            os.makedirs(self.profile_dir, exist_ok=True)
+            name = UNSAFE_FILENAME_PATTERN.sub("_", label).strip("_")
+            path = os.path.join(self.profile_dir, f"{int(time.time() * 1000)}-{name}-{int(seconds * 1000)}ms.folded")
+            with open(path, "w") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+
+            heapq.heappush(self._kept, (seconds, path))
+            while len(self._kept) > self.keep:
+                _, evicted = heapq.heappop(self._kept)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+        return path
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                active = list(self._active)
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = self._fold(frame)
+                if stack is not None:
+                    stacks.append(f"{names.get(thread_id, thread_id)};{stack}")
+
+            with self._lock:
+                for samples in active:
+                    samples.update(stacks)
+
+    def _fold(self, frame) -> Optional[str]:
+        """Root-to-leaf ``file:function`` frames joined by ';', or None for an idle thread"""
+        leaf = frame.f_code
+        if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+            return None
+
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(frames))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"active": len(self._active), "kept": len(self._kept)}
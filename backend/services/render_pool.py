@@ -0,0 +1,142 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from services.file_service import FileService, get_pdf_styles
+from services.metrics import EXPORT_RENDER_SECONDS, RENDER_POOL_PENDING
+from services.request_timing import timed
+
+_worker_file_service: Optional[FileService] = None
+
+
+def _init_worker():
+    """Build per-process state once: the FileService and the PDF styles"""
+    global _worker_file_service
+    _worker_file_service = FileService()
+    get_pdf_styles()
+
+
+def _render_job(method: str, *args: Any) -> Any:
+    """Run a FileService generator inside a worker process"""
+    return getattr(_worker_file_service, method)(*args)
+
+
+class RenderPool:
+    """Process pool for ReportLab/python-docx rendering.
+
+    Keeps document rendering off the event loop. Admission is bounded so a
+    burst of exports queues at most ``max_pending`` jobs, and only
+    ``max_workers`` of them are handed to the executor at once. Each job has
+    a timeout that starts once it holds a worker, and workers are recycled
+    after ``max_tasks_per_child`` jobs.
+    """
+
+    def __init__(self):
+        self.max_workers = int(os.getenv('RENDER_WORKERS', '2'))
+        self.max_pending = int(os.getenv('RENDER_MAX_PENDING', '32'))
+        self.queue_timeout = float(os.getenv('RENDER_QUEUE_TIMEOUT_SECONDS', '10'))
+        self.job_timeout = float(os.getenv('RENDER_JOB_TIMEOUT_SECONDS', '60'))
+        self.max_tasks_per_child = int(os.getenv('RENDER_MAX_TASKS_PER_CHILD', '200'))
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._workers = asyncio.Semaphore(self.max_workers)
+        self._pending = 0
+        self._stats = {"completed": 0, "failed": 0, "timeouts": 0, "rejected": 0, "restarts": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            context = multiprocessing.get_context('spawn')
+            try:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    max_tasks_per_child=self.max_tasks_per_child
+                )
+            except TypeError:
+                # max_tasks_per_child needs Python 3.11+
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker
+                )
+        return self._executor
+
+    @timed("render")
+    async def render(self, method: str, *args: Any) -> Any:
+        """Run FileService.<method>(*args) in a worker process"""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["rejected"] += 1
+            raise Exception("Export queue is full. Please try again shortly.")
+
+        self._pending += 1
+        RENDER_POOL_PENDING.inc()
+        try:
+            # Queued jobs wait here rather than inside the executor, so the timeout only counts rendering
+            async with self._workers:
+                return await self._run(method, *args)
+        finally:
+            self._pending -= 1
+            RENDER_POOL_PENDING.dec()
+            self._slots.release()
+
+    async def _run(self, method: str, *args: Any) -> Any:
+        """Render one job on a free worker, recycling the pool if it hangs or crashes"""
+        start = time.monotonic()
+        outcome = "error"
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_render_job, method, *args)
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.job_timeout)
+            self._stats["completed"] += 1
+            outcome = "ok"
+            return result
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            outcome = "timeout"
+            # The worker would keep rendering past the deadline and hold its slot, so kill the pool
+            if self._recycle(executor, terminate=True):
+                self._stats["restarts"] += 1
+            raise Exception("Export rendering timed out")
+        except BrokenProcessPool:
+            # A worker died (or the pool was recycled); start a fresh pool for the next job
+            self._stats["failed"] += 1
+            if self._recycle(executor):
+                self._stats["restarts"] += 1
+            raise Exception("Export worker crashed. Please try again.")
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            EXPORT_RENDER_SECONDS.labels(method, outcome).observe(time.monotonic() - start)
+
+    def _recycle(self, executor: ProcessPoolExecutor, terminate: bool = False) -> bool:
+        """Replace executor if it is still the current pool; True if it was replaced.
+
+        Running jobs cannot be cancelled, so with ``terminate`` the workers are
+        killed outright. Other jobs still on that pool fail as crashed.
+        """
+        if self._executor is not executor:
+            return False
+        self._executor = None
+        if terminate:
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counters and the number of queued or running jobs"""
+        return {**self._stats, "pending": self._pending, "max_workers": self.max_workers}
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._recycle(self._executor)
@@ -0,0 +1,165 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from services.profiler import SamplingProfiler
+
+
+class RequestTimings:
+    """Stage durations recorded while serving one request"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}
+        self._contexts: List[Dict] = []
+
+    def record(self, name: str, seconds: float):
+        # Stages also run on pool threads, so appends are locked
+        with self._lock:
+            totals = self._stages.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+    def record_context(self, purpose: str, input_tokens: int, tokens: int):
+        with self._lock:
+            self._contexts.append({"purpose": purpose, "input_tokens": input_tokens, "tokens": tokens})
+
+    def contexts(self) -> List[Dict]:
+        """Transcript tokens in and out of every context selection, in call order"""
+        with self._lock:
+            return list(self._contexts)
+
+    def stages(self) -> Dict[str, Tuple[float, int]]:
+        """{stage: (total seconds, count)} in the order stages first ran"""
+        with self._lock:
+            return {name: (totals[0], totals[1]) for name, totals in self._stages.items()}
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("request_timings", default=None)
+
+
+def record(name: str, seconds: float):
+    """Add a stage duration to the current request, if there is one"""
+    timings = _current.get()
+    if timings is not None:
+        timings.record(name, seconds)
+
+
+def record_context(purpose: str, input_tokens: int, tokens: int):
+    """Note one prompt's context selection on the current request, if there is one"""
+    timings = _current.get()
+    if timings is not None:
+        timings.record_context(purpose, input_tokens, tokens)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as a stage of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable:
+    """Decorator timing every call of a sync or async function as a stage"""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(timings: RequestTimings) -> str:
+    """Format stages as a Server-Timing header value; repeated stages are summed"""
+    entries = []
+    for name, (seconds, count) in timings.stages().items():
+        entry = f"{name};dur={seconds * 1000:.1f}"
+        if count > 1:
+            entry += f';desc="{count} calls"'
+        entries.append(entry)
+    entries.append(f"total;dur={timings.elapsed() * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """Per-request stage timing, reported as a Server-Timing header and a log line.
+
+    Services mark stages with ``stage()``/``timed()``; the timings live in
+    a context variable, so stages running in pool threads (``run_in_pool``
+    copies the context) count towards the request that started them. The
+    header reflects stages finished before the response starts; streamed
+    responses report later stages only in the log line, which is printed as
+    JSON for requests slower than TIMING_LOG_THRESHOLD_MS, together with the
+    transcript tokens in and out of each prompt's context selection.
+
+    Requests can also be profiled with the sampling profiler, see
+    ``services.profiler``.
+    """
+
+    def __init__(self, app, profiler: Optional[SamplingProfiler] = None):
+        self.app = app
+        self.log_threshold = float(os.getenv('TIMING_LOG_THRESHOLD_MS', '1000')) / 1000
+        self.profiler = profiler or SamplingProfiler()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing_header(timings))
+            await send(message)
+
+        profile = self.profiler.start(Headers(scope=scope))
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed = timings.elapsed()
+            label = f"{scope['method']} {scope['path']}"
+            if profile is not None:
+                self.profiler.finish(profile, label, elapsed)
+            if elapsed >= self.log_threshold:
+                print(json.dumps({
+                    "event": "request_timing",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "total_ms": round(elapsed * 1000, 1),
+                    "stages": {
+                        name: {"ms": round(seconds * 1000, 1), "count": count}
+                        for name, (seconds, count) in timings.stages().items()
+                    },
+                    "context_selection": timings.contexts(),
+                }))
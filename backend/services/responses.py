@@ -0,0 +1,107 @@
+import gzip
+import json
+import os
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+from services.executors import run_in_pool
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - responses are gzip-only without brotli
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/csv", "application/javascript")
+
+# Compressing bodies above this size on the event loop would stall other requests
+OFFLOAD_MIN_BYTES = 256 * 1024
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class CompressionMiddleware:
+    """Brotli/gzip compression for complete responses above a size threshold.
+
+    Only single-message bodies are compressed: streamed responses (SSE,
+    ZIP archives, chunked downloads) pass through untouched so events are
+    not held back, and already-compressed formats are skipped by type.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.minimum_size = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+        self.gzip_level = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+        self.brotli_quality = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if brotli is not None and "br" in accept_encoding:
+            encoding = "br"
+        elif "gzip" in accept_encoding:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                # Hold the headers until we know whether the body gets compressed
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if message.get("more_body", False) or not self._should_compress(headers, body):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= OFFLOAD_MIN_BYTES:
+                compressed = await run_in_pool("cpu", self._compress, body, encoding)
+            else:
+                compressed = self._compress(body, encoding)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, headers: MutableHeaders, body: bytes) -> bool:
+        if len(body) < self.minimum_size or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip()
+        return content_type in COMPRESSIBLE_TYPES
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
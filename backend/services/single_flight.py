@@ -0,0 +1,50 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+
+def make_key(operation: str, *parts: Any) -> str:
+    """Build a stable coalescing key from an operation name and its inputs"""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{operation}:{digest}"
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task instead of starting their own. The key
+    is released as soon as the task finishes, so later calls run afresh.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func() for key, or join the call already in flight"""
+        self.stats["calls"] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+        else:
+            self.stats["coalesced"] += 1
+
+        # Shield so one cancelled caller does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running"""
+        return len(self._in_flight)
+
+
+# Shared by all services so /api/stats can report coalescing as a whole
+single_flight = SingleFlight()
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from services.cache_service import content_key
+from services.context_selector import context_heading
+from services.executors import run_in_pool
+from services.metrics import FALLBACKS
+from services.request_timing import timed
+from services.single_flight import single_flight, make_key
+
+
+class StudyPackService:
+    """Summary, flashcards and quiz for one transcript from a single request.
+
+    The transcript is cleaned and chunked once and the three generators run
+    concurrently on the result. With STUDY_PACK_SINGLE_CALL enabled, short
+    transcripts are served by one structured Gemini call instead of three.
+    """
+
+    PROMPT_VERSION = "2"
+
+    def __init__(self, summarization_service, study_tools_service):
+        self.summarization_service = summarization_service
+        self.study_tools_service = study_tools_service
+        self.gateway = summarization_service.gateway
+        self.response_cache = summarization_service.response_cache
+
+        self.single_call = os.getenv('STUDY_PACK_SINGLE_CALL', 'false').lower() == 'true'
+
+    async def generate(self, transcript: str, video_title: str, transcript_with_timestamps: List[Dict] = None,
+                       video_id: Optional[str] = None, num_flashcards: int = 10, num_questions: int = 5,
+                       use_cache: bool = True, normalized: bool = False) -> Dict[str, Any]:
+        """Generate the summary, flashcards and quiz together"""
+        pack = {}
+        async for kind, result in self.generate_stream(
+            transcript, video_title, transcript_with_timestamps, video_id, num_flashcards, num_questions, use_cache,
+            normalized
+        ):
+            pack[kind] = result
+        return pack
+
+    async def generate_stream(self, transcript: str, video_title: str, transcript_with_timestamps: List[Dict] = None,
+                              video_id: Optional[str] = None, num_flashcards: int = 10, num_questions: int = 5,
+                              use_cache: bool = True, normalized: bool = False) -> AsyncIterator[tuple]:
+        """Yield (kind, result) for summary, flashcards and quiz as each completes"""
+        if not self.gateway.is_configured():
+            raise Exception("Gemini API key not configured. Please set GEMINI_API_KEY environment variable.")
+
+        prepared = await self.summarization_service.prepare(transcript, normalized)
+        cleaned_text = prepared["cleaned_text"]
+
+        if self.single_call and len(prepared["chunks"]) <= 1:
+            key = await run_in_pool(
+                "cpu", make_key, "study_pack", cleaned_text, video_title, num_flashcards, num_questions, use_cache
+            )
+            pack = await single_flight.do(
+                key, lambda: self._generate_single_call(cleaned_text, video_title, num_flashcards, num_questions, use_cache)
+            )
+            if pack is not None:
+                summary = pack["summary"]
+                if transcript_with_timestamps:
+                    summary = await self.summarization_service.add_timestamps(
+                        summary, transcript_with_timestamps, video_id
+                    )
+                yield "summary", summary
+                yield "flashcards", pack["flashcards"]
+                yield "quiz", pack["quiz"]
+                return
+
+        async def run(kind: str, coroutine):
+            return kind, await coroutine
+
+        tasks = [
+            asyncio.ensure_future(run("summary", self.summarization_service.summarize_prepared(
+                prepared, transcript_with_timestamps, video_id, use_cache
+            ))),
+            asyncio.ensure_future(run("flashcards", self.study_tools_service.generate_flashcards(
+                cleaned_text, video_title, num_flashcards, use_cache, normalized=True
+            ))),
+            asyncio.ensure_future(run("quiz", self.study_tools_service.generate_quiz(
+                cleaned_text, video_title, num_questions, use_cache, normalized=True
+            ))),
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _generate_single_call(self, cleaned_text: str, video_title: str, num_flashcards: int,
+                                    num_questions: int, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """One structured Gemini call for all three outputs; None if the response is unusable"""
+        cache_key = await run_in_pool(
+            "cpu", content_key, self.summarization_service.model_name, self.PROMPT_VERSION, cleaned_text,
+            operation="study_pack", video_title=video_title,
+            num_flashcards=num_flashcards, num_questions=num_questions,
+            context_tokens=self.summarization_service.context_tokens
+        )
+        cached = await self.response_cache.aget(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
+
+        prompt = await run_in_pool(
+            "cpu", self._create_study_pack_prompt, cleaned_text, video_title, num_flashcards, num_questions
+        )
+        try:
+            response_text = await self.gateway.generate(prompt, service="study_pack")
+        except Exception as e:
+            print(f"Error generating study pack: {e}")
+            FALLBACKS.labels("study_pack", "error").inc()
+            return None
+
+        pack = self._parse_study_pack_response(response_text)
+        if pack is None:
+            print("Study pack response could not be parsed, generating outputs separately")
+            FALLBACKS.labels("study_pack_parse", "unparseable").inc()
+            return None
+
+        await self.response_cache.aset(cache_key, pack)
+        return pack
+
+    def _create_study_pack_prompt(self, transcript: str, video_title: str, num_flashcards: int,
+                                  num_questions: int) -> str:
+        """Create prompt asking for summary, flashcards and quiz in one JSON object"""
+        context = self.summarization_service.context_selector.select(
+            transcript, self.summarization_service.context_tokens, "study_pack"
+        )
+        return f"""
+Create study materials from this video transcript: "{video_title}"
+
+{context_heading(context)}:
+{context["text"]}
+
+Requirements:
+- "summary": 5-8 concise bullet points covering the main ideas, in order
+- "flashcards": exactly {num_flashcards} question/answer pairs testing key concepts
+- "quiz": exactly {num_questions} multiple choice questions with options A-D, one correct answer and an explanation
+
+Format your response as JSON only:
+{{
+  "summary": ["First key point", "Second key point"],
+  "flashcards": [
+    {{
+      "question": "What is...",
+      "answer": "The answer is...",
+      "category": "Definition/Concept/Process/Fact"
+    }}
+  ],
+  "quiz": {{
+    "title": "{video_title} - Quiz",
+    "questions": [
+      {{
+        "question": "What is...",
+        "options": {{
+          "A": "Option A",
+          "B": "Option B",
+          "C": "Option C",
+          "D": "Option D"
+        }},
+        "correct_answer": "A",
+        "explanation": "The correct answer is A because..."
+      }}
+    ]
+  }}
+}}
+"""
+
+    @timed("parse")
+    def _parse_study_pack_response(self, response_text: str) -> Optional[Dict[str, Any]]:
+        """Parse the combined JSON response, or None if any part is missing"""
+        try:
+            start_idx = response_text.find('{')
+            end_idx = response_text.rfind('}') + 1
+            data = json.loads(response_text[start_idx:end_idx])
+        except (ValueError, TypeError):
+            return None
+
+        summary = data.get('summary')
+        flashcards = data.get('flashcards')
+        quiz = data.get('quiz')
+        if not isinstance(summary, list) or not isinstance(flashcards, list) or not isinstance(quiz, dict):
+            return None
+
+        points = [str(point).strip() for point in summary if str(point).strip()]
+        if not points or not flashcards or not quiz.get('questions'):
+            return None
+
+        return {
+            "summary": [{"point": point, "section": "Summary"} for point in points],
+            "flashcards": flashcards,
+            "quiz": quiz,
+        }
@@ -1,76 +1,138 @@
-import asyncio
-import google.generativeai as genai
 import os
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import json
 from dotenv import load_dotenv
 
+from services.cache_service import content_key, get_llm_cache
+from services.context_selector import context_heading, get_context_selector
+from services.executors import run_in_pool
+from services.llm_gateway import get_llm_gateway
+from services.metrics import FALLBACKS
+from services.request_timing import timed
+from services.single_flight import single_flight, make_key
+from services.text_normalizer import normalize_text
+
 load_dotenv()
 
 class StudyToolsService:
+    PROMPT_VERSION = "2"
+
     def __init__(self):
-        self.api_key = os.getenv('GEMINI_API_KEY')
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        else:
-            self.model = None
+        self.gateway = get_llm_gateway()
+        self.model_name = self.gateway.model_name
+
+        self.response_cache = get_llm_cache()
+
+        # Prompts carry the most salient transcript windows that fit this many tokens
+        self.context_selector = get_context_selector()
+        self.context_tokens = int(os.getenv('STUDY_TOOLS_CONTEXT_TOKENS', '1500'))
 
     def _is_configured(self):
         """Check if Gemini API is properly configured"""
-        return self.model is not None
-
-    async def generate_flashcards(self, transcript: str, video_title: str, num_cards: int = 10) -> List[Dict[str, str]]:
-        """Generate flashcards from video transcript"""
+        return self.gateway.is_configured()
+
+    async def generate_flashcards(self, transcript: str, video_title: str, num_cards: int = 10,
+                                  use_cache: bool = True, normalized: bool = False) -> List[Dict[str, str]]:
+        """Generate flashcards from video transcript; pass normalized=True for already-cleaned text"""
+        # Hashing a long transcript is CPU work, so keys are derived off the event loop
+        key = await run_in_pool("cpu", make_key, "flashcards", transcript, video_title, num_cards, use_cache, normalized)
+        return await single_flight.do(
+            key, lambda: self._generate_flashcards(transcript, video_title, num_cards, use_cache, normalized)
+        )
+
+    async def _generate_flashcards(self, transcript: str, video_title: str, num_cards: int,
+                                   use_cache: bool = True, normalized: bool = False) -> List[Dict[str, str]]:
+        """Generate flashcards from video transcript (uncoalesced)"""
         if not self._is_configured():
             raise Exception("Gemini API key not configured for study tools.")
 
-        prompt = self._create_flashcard_prompt(transcript, video_title, num_cards)
+        transcript, cache_key = await run_in_pool(
+            "cpu", self._prepare, "flashcards", transcript, video_title, num_cards, normalized
+        )
+        cached = await self.response_cache.aget(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
+
+        # Context selection scans the whole transcript, so keep it off the event loop
+        prompt = await run_in_pool("cpu", self._create_flashcard_prompt, transcript, video_title, num_cards)
 
         try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                self.model.generate_content,
-                prompt
-            )
-
-            flashcards = self._parse_flashcard_response(response.text)
+            response_text = await self.gateway.generate(prompt, service="study_tools")
+
+            # Text-parsed fallbacks may be refusals, so only parsed JSON is cached
+            flashcards, parsed = self._parse_flashcard_response(response_text)
+            if parsed:
+                await self.response_cache.aset(cache_key, flashcards)
             return flashcards
 
         except Exception as e:
             print(f"Error generating flashcards: {e}")
+            FALLBACKS.labels("flashcards", "error").inc()
             return self._fallback_flashcards(transcript)
 
-    async def generate_quiz(self, transcript: str, video_title: str, num_questions: int = 5) -> Dict[str, any]:
-        """Generate multiple choice quiz from video transcript"""
+    async def generate_quiz(self, transcript: str, video_title: str, num_questions: int = 5,
+                            use_cache: bool = True, normalized: bool = False) -> Dict[str, any]:
+        """Generate multiple choice quiz from video transcript; pass normalized=True for already-cleaned text"""
+        key = await run_in_pool("cpu", make_key, "quiz", transcript, video_title, num_questions, use_cache, normalized)
+        return await single_flight.do(
+            key, lambda: self._generate_quiz(transcript, video_title, num_questions, use_cache, normalized)
+        )
+
+    async def _generate_quiz(self, transcript: str, video_title: str, num_questions: int,
+                             use_cache: bool = True, normalized: bool = False) -> Dict[str, any]:
+        """Generate multiple choice quiz from video transcript (uncoalesced)"""
         if not self._is_configured():
             raise Exception("Gemini API key not configured for study tools.")
 
-        prompt = self._create_quiz_prompt(transcript, video_title, num_questions)
+        transcript, cache_key = await run_in_pool(
+            "cpu", self._prepare, "quiz", transcript, video_title, num_questions, normalized
+        )
+        cached = await self.response_cache.aget(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
+
+        prompt = await run_in_pool("cpu", self._create_quiz_prompt, transcript, video_title, num_questions)
 
         try:
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                self.model.generate_content,
-                prompt
-            )
-
-            quiz = self._parse_quiz_response(response.text)
+            response_text = await self.gateway.generate(prompt, service="study_tools")
+
+            quiz, parsed = self._parse_quiz_response(response_text)
+            if parsed:
+                await self.response_cache.aset(cache_key, quiz)
             return quiz
 
         except Exception as e:
             print(f"Error generating quiz: {e}")
+            FALLBACKS.labels("quiz", "error").inc()
             return self._fallback_quiz(transcript)
 
+    def _prepare(self, operation: str, transcript: str, video_title: str, num_items: int,
+                 normalized: bool) -> Tuple[str, str]:
+        """Cleaned transcript and response cache key for a study tool request (blocking)"""
+        # Cleaned the same way as for summaries, so the study pack and these endpoints share cache entries
+        if not normalized:
+            transcript = self._clean_text(transcript)
+        return transcript, self._cache_key(operation, transcript, video_title, num_items)
+
+    @timed("clean_text")
+    def _clean_text(self, text: str) -> str:
+        return normalize_text(text)
+
+    def _cache_key(self, operation: str, transcript: str, video_title: str, num_items: int) -> str:
+        """Response cache key for a study tool request on a cleaned transcript"""
+        return content_key(
+            self.model_name, self.PROMPT_VERSION, transcript,
+            operation=operation, video_title=video_title, num_items=num_items, context_tokens=self.context_tokens
+        )
+
     def _create_flashcard_prompt(self, transcript: str, video_title: str, num_cards: int) -> str:
         """Create prompt for generating flashcards"""
+        context = self.context_selector.select(transcript, self.context_tokens, "flashcards")
         return f"""
 Create {num_cards} educational flashcards from this video transcript: "{video_title}"
 
-Transcript (first 3000 characters):
-{transcript[:3000]}
+{context_heading(context)}:
+{context["text"]}
 
 Requirements:
 - Create question/answer pairs that test key concepts
@@ -95,11 +157,12 @@ Generate exactly {num_cards} flashcards:
 
     def _create_quiz_prompt(self, transcript: str, video_title: str, num_questions: int) -> str:
         """Create prompt for generating quiz questions"""
+        context = self.context_selector.select(transcript, self.context_tokens, "quiz")
         return f"""
 Create {num_questions} multiple choice quiz questions from this video transcript: "{video_title}"
 
-Transcript (first 3000 characters):
-{transcript[:3000]}
+{context_heading(context)}:
+{context["text"]}
 
 Requirements:
 - Create challenging but fair questions
@@ -131,8 +194,9 @@ Format your response as JSON:
 Generate exactly {num_questions} questions:
 """
 
-    def _parse_flashcard_response(self, response_text: str) -> List[Dict[str, str]]:
-        """Parse flashcard response from Gemini"""
+    @timed("parse")
+    def _parse_flashcard_response(self, response_text: str) -> Tuple[List[Dict[str, str]], bool]:
+        """Parse flashcard response from Gemini; the flag is False unless the JSON parsed"""
         try:
             # Try to extract JSON from response
             start_idx = response_text.find('{')
@@ -141,15 +205,19 @@ Generate exactly {num_questions} questions:
             if start_idx != -1 and end_idx != -1:
                 json_str = response_text[start_idx:end_idx]
                 data = json.loads(json_str)
-                return data.get('flashcards', [])
+                flashcards = data.get('flashcards', [])
+                if flashcards:
+                    return flashcards, True
         except:
             pass
 
         # Fallback parsing
-        return self._fallback_flashcard_parsing(response_text)
+        FALLBACKS.labels("flashcards_parse", "unparseable").inc()
+        return self._fallback_flashcard_parsing(response_text), False
 
-    def _parse_quiz_response(self, response_text: str) -> Dict[str, any]:
-        """Parse quiz response from Gemini"""
+    @timed("parse")
+    def _parse_quiz_response(self, response_text: str) -> Tuple[Dict[str, any], bool]:
+        """Parse quiz response from Gemini; the flag is False unless the JSON parsed"""
         try:
             # Try to extract JSON from response
             start_idx = response_text.find('{')
@@ -158,12 +226,15 @@ Generate exactly {num_questions} questions:
             if start_idx != -1 and end_idx != -1:
                 json_str = response_text[start_idx:end_idx]
                 data = json.loads(json_str)
-                return data.get('quiz', {})
+                quiz = data.get('quiz', {})
+                if quiz.get('questions'):
+                    return quiz, True
         except:
             pass
 
         # Fallback parsing
-        return self._fallback_quiz_parsing(response_text)
+        FALLBACKS.labels("quiz_parse", "unparseable").inc()
+        return self._fallback_quiz_parsing(response_text), False
 
     def _fallback_flashcard_parsing(self, response_text: str) -> List[Dict[str, str]]:
         """Fallback method to parse flashcards from unstructured text"""
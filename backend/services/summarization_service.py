@@ -1,61 +1,393 @@
 import asyncio
-import google.generativeai as genai
 import os
-from typing import List, Dict
-import re
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
+from services.cache_service import content_key, get_llm_cache
+from services.context_selector import context_heading, estimate_tokens, get_context_selector
+from services.executors import run_in_pool
+from services.extractive_summarizer import ExtractiveSummarizer
+from services.llm_gateway import get_llm_gateway
+from services.metrics import FALLBACKS
+from services.request_timing import timed
+from services.single_flight import single_flight, make_key
+from services.text_normalizer import normalize_text
+from services.transcript_index import TranscriptIndex
+
 load_dotenv()
 
 class SummarizationService:
+    PROMPT_VERSION = "3"
+
     def __init__(self):
-        self.api_key = os.getenv('GEMINI_API_KEY')
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        else:
-            self.model = None
+        self.gateway = get_llm_gateway()
+        self.model_name = self.gateway.model_name
+
+        self.response_cache = get_llm_cache()
+
+        # Local engine for Gemini failures and deliberate load shedding
+        self.extractive_summarizer = ExtractiveSummarizer()
+
+        # Hierarchical (map-reduce) summarization for long transcripts
+        self.chunk_tokens = int(os.getenv('SUMMARY_CHUNK_TOKENS', '3000'))
+        self.max_concurrency = int(os.getenv('SUMMARY_MAX_CONCURRENCY', '4'))
+        self._chunk_semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Every summary call (single or per chunk) carries at most this many transcript tokens,
+        # picked by salience; chunks still span the whole video, so coverage is kept
+        self.context_selector = get_context_selector()
+        self.context_tokens = int(os.getenv('SUMMARY_CONTEXT_TOKENS', '2000'))
 
     def _is_configured(self):
         """Check if Gemini API is properly configured"""
-        return self.model is not None
+        return self.gateway.is_configured()
+
+    async def summarize(self, text: str, transcript_with_timestamps: List[Dict] = None, video_id: Optional[str] = None,
+                        use_cache: bool = True, normalized: bool = False) -> List[Dict[str, str]]:
+        """Summarize text into bullet points using Gemini.
+
+        Pass ``normalized=True`` for text that already went through
+        TranscriptNormalizer (e.g. transcripts from the store) to skip cleaning.
+        """
+        # Identical concurrent requests share one Gemini call; hashing a long transcript stays off the event loop
+        key = await run_in_pool(
+            "cpu", make_key, "summarize", text, transcript_with_timestamps, video_id, use_cache, normalized
+        )
+        return await single_flight.do(
+            key, lambda: self._summarize(text, transcript_with_timestamps, video_id, use_cache, normalized)
+        )
+
+    async def _summarize(self, text: str, transcript_with_timestamps: List[Dict] = None, video_id: Optional[str] = None,
+                         use_cache: bool = True, normalized: bool = False) -> List[Dict[str, str]]:
+        """Summarize text into bullet points using Gemini (uncoalesced)"""
+        if not self._is_configured():
+            raise Exception("Gemini API key not configured. Please set GEMINI_API_KEY environment variable.")
 
-    async def summarize(self, text: str, transcript_with_timestamps: List[Dict] = None) -> List[Dict[str, str]]:
-        """Summarize text into bullet points using Gemini"""
+        prepared = await self.prepare(text, normalized)
+        return await self.summarize_prepared(prepared, transcript_with_timestamps, video_id, use_cache)
+
+    async def prepare(self, text: str, normalized: bool = False) -> Dict:
+        """Clean and chunk a transcript once so several generators can share the result"""
+        # Runs off the event loop; long transcripts take a while
+        return await run_in_pool("cpu", self._prepare, text, normalized)
+
+    def _prepare(self, text: str, normalized: bool = False) -> Dict:
+        """Cleaned text, chunks and response cache key for a transcript (blocking)"""
+        cleaned_text = text if normalized else self._clean_text(text)
+        return {
+            "cleaned_text": cleaned_text,
+            "chunks": self._chunk_text(cleaned_text, self.chunk_tokens),
+            "cache_key": self._cache_key(cleaned_text)
+        }
+
+    async def summarize_prepared(self, prepared: Dict, transcript_with_timestamps: List[Dict] = None,
+                                 video_id: Optional[str] = None, use_cache: bool = True) -> List[Dict[str, str]]:
+        """Summarize a transcript already run through prepare()"""
         if not self._is_configured():
             raise Exception("Gemini API key not configured. Please set GEMINI_API_KEY environment variable.")
 
-        # Clean and prepare text
-        cleaned_text = self._clean_text(text)
+        cleaned_text = prepared["cleaned_text"]
+        chunks = prepared["chunks"]
 
-        # Create prompt for Gemini
-        prompt = self._create_summarization_prompt(cleaned_text)
+        cache_key = prepared["cache_key"]
+        cached = await self.response_cache.aget(cache_key) if use_cache else None
+        if cached is None and self.gateway.is_saturated():
+            # Shed load: answer locally instead of queueing behind an exhausted quota
+            FALLBACKS.labels("summary", "saturated").inc()
+            return await self._local_summary(cleaned_text, transcript_with_timestamps, video_id)
 
         try:
-            # Generate summary using Gemini
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                self.model.generate_content,
-                prompt
-            )
-
-            # Parse the response into bullet points
-            bullet_points = self._parse_gemini_response(response.text)
+            bullet_points = cached
+            if bullet_points is None:
+                if len(chunks) > 1:
+                    response_text = await self._map_reduce_summary(chunks)
+                else:
+                    prompt = await run_in_pool("cpu", self._create_summarization_prompt, cleaned_text)
+                    response_text = await self._generate(prompt)
+
+                # Parse the response into bullet points; placeholders and refusals are not cached
+                bullet_points, parsed = self._parse_gemini_response(response_text)
+                if parsed:
+                    await self.response_cache.aset(cache_key, bullet_points)
 
             # Add timestamps if available
             if transcript_with_timestamps:
-                bullet_points = self._add_timestamps_to_summary(bullet_points, transcript_with_timestamps)
+                bullet_points = await self.add_timestamps(bullet_points, transcript_with_timestamps, video_id)
 
             return bullet_points
 
         except Exception as e:
             print(f"Error with Gemini API: {e}")
-            # Fallback to simple extractive summary
-            return self._fallback_summary(cleaned_text)
+            # Fallback to local extractive summary
+            FALLBACKS.labels("summary", "error").inc()
+            return await self._local_summary(cleaned_text, transcript_with_timestamps, video_id)
+
+    async def _local_summary(self, cleaned_text: str, transcript_with_timestamps: List[Dict] = None,
+                             video_id: Optional[str] = None) -> List[Dict[str, str]]:
+        """Extractive summary computed locally, with timestamps when available"""
+        bullet_points = await run_in_pool("cpu", self._fallback_summary, cleaned_text)
+        if transcript_with_timestamps and bullet_points:
+            bullet_points = await self.add_timestamps(bullet_points, transcript_with_timestamps, video_id)
+        return bullet_points
+
+    async def add_timestamps(self, bullet_points: List[Dict[str, str]], transcript_with_timestamps: List[Dict],
+                             video_id: Optional[str] = None) -> List[Dict[str, str]]:
+        """Attach the best-matching transcript timestamp to each point"""
+        return await run_in_pool(
+            "cpu", self._add_timestamps_to_summary, bullet_points, transcript_with_timestamps, video_id
+        )
+
+    def _cache_key(self, cleaned_text: str) -> str:
+        """Response cache key for a cleaned transcript"""
+        return content_key(
+            self.model_name, self.PROMPT_VERSION, cleaned_text,
+            operation="summarize", chunk_tokens=self.chunk_tokens, context_tokens=self.context_tokens
+        )
+
+    async def _generate(self, prompt: str) -> str:
+        """Run a single Gemini call and return its text"""
+        return await self.gateway.generate(prompt, service="summarization")
+
+    async def _generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Run a streaming Gemini call, yielding text fragments as they arrive"""
+        async for fragment in self.gateway.generate_stream(prompt, service="summarization"):
+            yield fragment
+
+    async def summarize_stream(self, text: str, transcript_with_timestamps: List[Dict] = None, video_id: Optional[str] = None,
+                               use_cache: bool = True, normalized: bool = False) -> AsyncIterator[Dict]:
+        """Summarize text, yielding each bullet point as soon as Gemini finishes it.
+
+        Yields ``{"event": "bullet", "data": point}`` for every point (with its
+        timestamp attached when available) and a final
+        ``{"event": "done", "data": {"summary": points}}``.
+        """
+        if not self._is_configured():
+            raise Exception("Gemini API key not configured. Please set GEMINI_API_KEY environment variable.")
+
+        prepared = await self.prepare(text, normalized)
+        cleaned_text = prepared["cleaned_text"]
+        chunks = prepared["chunks"]
+
+        # Index the transcript once and reuse it for every streamed bullet
+        index = None
+        if transcript_with_timestamps:
+            index = await run_in_pool("cpu", TranscriptIndex, transcript_with_timestamps)
+
+        cache_key = prepared["cache_key"]
+        cached = await self.response_cache.aget(cache_key) if use_cache else None
+        if cached is not None:
+            bullet_points = [self._attach_timestamp(item["point"], index, video_id) for item in cached]
+            for bullet in bullet_points:
+                yield {"event": "bullet", "data": bullet}
+            yield {"event": "done", "data": {"summary": bullet_points}}
+            return
+
+        if self.gateway.is_saturated():
+            FALLBACKS.labels("summary", "saturated").inc()
+            bullet_points = [
+                self._attach_timestamp(item["point"], index, video_id)
+                for item in await run_in_pool("cpu", self._fallback_summary, cleaned_text)
+            ]
+            for bullet in bullet_points:
+                yield {"event": "bullet", "data": bullet}
+            yield {"event": "done", "data": {"summary": bullet_points}}
+            return
+
+        bullet_points = []
+        response_text = ""
+        parsed_points = None
+        try:
+            # Long transcripts are reduced first; only the final call is streamed
+            if len(chunks) > 1:
+                partials = await self._summarize_chunks(await run_in_pool("cpu", self._create_chunk_prompts, chunks))
+                prompt = self._create_reduce_prompt(partials, final=True)
+            else:
+                prompt = await run_in_pool("cpu", self._create_summarization_prompt, cleaned_text)
+
+            buffer = ""
+            async for fragment in self._generate_stream(prompt):
+                response_text += fragment
+                buffer += fragment
+                *lines, buffer = buffer.split('\n')
+                for line in lines:
+                    point = self._parse_bullet_line(line)
+                    if point and len(bullet_points) < 8:
+                        bullet = self._attach_timestamp(point, index, video_id)
+                        bullet_points.append(bullet)
+                        yield {"event": "bullet", "data": bullet}
+
+            point = self._parse_bullet_line(buffer)
+            if point and len(bullet_points) < 8:
+                bullet = self._attach_timestamp(point, index, video_id)
+                bullet_points.append(bullet)
+                yield {"event": "bullet", "data": bullet}
+
+            # Cache the same shape the non-streaming path stores
+            parsed_points, parsed = self._parse_gemini_response(response_text)
+            if parsed:
+                await self.response_cache.aset(cache_key, parsed_points)
+
+        except Exception as e:
+            print(f"Error with Gemini API: {e}")
+            if not bullet_points:
+                # Fallback to local extractive summary
+                FALLBACKS.labels("summary", "error").inc()
+                for item in await run_in_pool("cpu", self._fallback_summary, cleaned_text):
+                    bullet = self._attach_timestamp(item["point"], index, video_id)
+                    bullet_points.append(bullet)
+                    yield {"event": "bullet", "data": bullet}
+
+        # No bullet lines in the response: fall back to whole-text parsing, reusing the parse above
+        if not bullet_points:
+            if parsed_points is None:
+                parsed_points = self._parse_gemini_response(response_text)[0]
+            for bullet in parsed_points:
+                if index is not None:
+                    bullet = self._attach_timestamp(bullet["point"], index, video_id)
+                bullet_points.append(bullet)
+                yield {"event": "bullet", "data": bullet}
+
+        yield {"event": "done", "data": {"summary": bullet_points}}
+
+    def _attach_timestamp(self, point: str, index: Optional[TranscriptIndex] = None, video_id: Optional[str] = None) -> Dict[str, str]:
+        """Build a bullet dict for point, with its timestamp when available"""
+        bullet = {"point": point, "section": "Summary"}
+        if index is not None:
+            bullet = self._add_timestamps_to_summary([bullet], index.segments, video_id, index)[0]
+        return bullet
+
+    async def _map_reduce_summary(self, chunks: List[str]) -> str:
+        """Summarize chunks concurrently, then reduce the partial summaries"""
+        partials = await self._summarize_chunks(await run_in_pool("cpu", self._create_chunk_prompts, chunks))
+
+        # Collapse the partial summaries further if they still exceed one chunk
+        while len(partials) > 1 and self._estimate_tokens("\n".join(partials)) > self.chunk_tokens:
+            groups = self._group_partials(partials, self.chunk_tokens)
+            if len(groups) == len(partials):
+                break
+            partials = await self._summarize_chunks(
+                [self._create_reduce_prompt(group, final=False) for group in groups]
+            )
+
+        return await self._generate(self._create_reduce_prompt(partials, final=True))
+
+    async def _summarize_chunks(self, prompts: List[str]) -> List[str]:
+        """Run chunk prompts concurrently under the chunk semaphore"""
+        async def run(prompt: str) -> str:
+            async with self._chunk_semaphore:
+                return await self._generate(prompt)
+
+        results = await asyncio.gather(*(run(prompt) for prompt in prompts), return_exceptions=True)
+
+        partials = []
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Error summarizing transcript chunk: {result}")
+            elif result.strip():
+                partials.append(result.strip())
+
+        if not partials:
+            raise Exception("All transcript chunks failed to summarize")
+
+        return partials
+
+    def _estimate_tokens(self, text: str) -> int:
+        """Roughly estimate the token count of text (~4 characters per token)"""
+        return estimate_tokens(text)
+
+    @timed("chunk_text")
+    def _chunk_text(self, text: str, max_tokens: int) -> List[str]:
+        """Split text on word boundaries into chunks of at most max_tokens"""
+        max_chars = max_tokens * 4
+        if len(text) <= max_chars:
+            return [text]
+
+        chunks = []
+        current = []
+        current_len = 0
+        for word in text.split():
+            if current and current_len + len(word) + 1 > max_chars:
+                chunks.append(' '.join(current))
+                current = []
+                current_len = 0
+            current.append(word)
+            current_len += len(word) + 1
+
+        if current:
+            chunks.append(' '.join(current))
+
+        return chunks
+
+    def _group_partials(self, partials: List[str], max_tokens: int) -> List[List[str]]:
+        """Group consecutive partial summaries so each group fits max_tokens"""
+        groups = []
+        current = []
+        current_tokens = 0
+        for partial in partials:
+            tokens = self._estimate_tokens(partial)
+            if current and current_tokens + tokens > max_tokens:
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            current.append(partial)
+            current_tokens += tokens
+
+        if current:
+            groups.append(current)
+
+        return groups
+
+    def _create_chunk_prompts(self, chunks: List[str]) -> List[str]:
+        """Map prompts for every chunk, in video order (blocking)"""
+        return [self._create_chunk_prompt(chunk, i + 1, len(chunks)) for i, chunk in enumerate(chunks)]
+
+    def _create_chunk_prompt(self, text: str, part: int, total_parts: int) -> str:
+        """Create a prompt summarizing one part of a long transcript"""
+        context = self.context_selector.select(text, self.context_tokens, "summary_chunk")
+        return f"""
+You are a professional content summarizer. Below is part {part} of {total_parts} of a YouTube video transcript.
+
+Extract the 3-5 most important points from this part only:
+- Focus on key concepts, arguments, definitions and actionable insights
+- Keep each point concise (1-2 sentences max)
+
+{context_heading(context)} (part {part} of {total_parts}):
+{context["text"]}
+
+Provide your response as bullet points using this format:
+• Point 1
+• Point 2
+etc.
+"""
+
+    def _create_reduce_prompt(self, partials: List[str], final: bool = True) -> str:
+        """Create a prompt combining partial summaries in video order"""
+        sections = "\n\n".join(
+            f"Section {i + 1}:\n{partial}" for i, partial in enumerate(partials)
+        )
+        target = "5-8 key points that capture the main ideas of the whole video" if final else "the 4-6 most important points"
+
+        return f"""
+You are a professional content summarizer. The following are notes from consecutive sections of one YouTube video, in order.
+
+Combine them into {target}:
+- Merge overlapping points and drop minor details
+- Preserve the order in which topics appear in the video
+- Keep each point concise (1-2 sentences max)
+
+Section notes:
+{sections}
+
+Provide your response as bullet points using this format:
+• Point 1
+• Point 2
+• Point 3
+etc.
+"""
 
     def _create_summarization_prompt(self, text: str) -> str:
         """Create a prompt for Gemini to summarize the video transcript"""
+        context = self.context_selector.select(text, self.context_tokens, "summary")
         return f"""
 You are a professional content summarizer. Analyze this YouTube video transcript and create a concise summary.
 
@@ -70,8 +402,8 @@ For other content:
 - Focus on actionable insights, important concepts, or main arguments
 - Organize by topic if the content has distinct sections
 
-Transcript:
-{text[:3000]}
+{context_heading(context)}:
+{context["text"]}
 
 Provide your response as bullet points using this format:
 • Point 1
@@ -82,39 +414,32 @@ etc.
 Keep each point concise (1-2 sentences max).
 """
 
-    def _parse_gemini_response(self, response_text: str) -> List[Dict[str, str]]:
-        """Parse Gemini's response into structured bullet points"""
+    @timed("parse")
+    def _parse_gemini_response(self, response_text: str) -> Tuple[List[Dict[str, str]], bool]:
+        """Parse Gemini's response into structured bullet points.
+
+        Also returns whether the points came from bullet lines; False means
+        sentence extraction or the placeholder was used instead.
+        """
         bullet_points = []
         lines = response_text.strip().split('\n')
+        parsed = False
 
         current_section = "Summary"
 
         for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Check if it's a bullet point (various formats)
-            if (line.startswith('•') or line.startswith('-') or line.startswith('*') or
-                line.startswith('→') or line.startswith('▪') or line.startswith('◦')):
-                # Clean the bullet point
-                point = line[1:].strip()
-                if point and len(point) > 15:  # Filter out very short points
-                    bullet_points.append({
-                        "point": point,
-                        "section": current_section
-                    })
-            elif any(line.startswith(f"{i}.") for i in range(1, 20)):
-                # Handle numbered lists (1. 2. 3. etc.)
-                point = line.split('.', 1)[1].strip() if '.' in line else line
-                if point and len(point) > 15:
-                    bullet_points.append({
-                        "point": point,
-                        "section": current_section
-                    })
+            point = self._parse_bullet_line(line)
+            if point:
+                bullet_points.append({
+                    "point": point,
+                    "section": current_section
+                })
 
         # If no bullet points found, try to extract meaningful sentences
-        if not bullet_points:
+        if bullet_points:
+            parsed = True
+        else:
+            FALLBACKS.labels("summary_parse", "unparseable").inc()
             # Split by sentences and filter for meaningful content
             sentences = response_text.replace('\n', ' ').split('.')
             for sentence in sentences:
@@ -136,71 +461,59 @@ Keep each point concise (1-2 sentences max).
                 "section": current_section
             }]
 
-        return bullet_points[:8]  # Limit to 8 points
+        return bullet_points[:8], parsed  # Limit to 8 points
+
+    def _parse_bullet_line(self, line: str) -> Optional[str]:
+        """Extract the point text from a single bullet or numbered line"""
+        line = line.strip()
+        if not line:
+            return None
+
+        # Check if it's a bullet point (various formats)
+        if (line.startswith('•') or line.startswith('-') or line.startswith('*') or
+            line.startswith('→') or line.startswith('▪') or line.startswith('◦')):
+            # Clean the bullet point
+            point = line[1:].strip()
+        elif any(line.startswith(f"{i}.") for i in range(1, 20)):
+            # Handle numbered lists (1. 2. 3. etc.)
+            point = line.split('.', 1)[1].strip()
+        else:
+            return None
 
-    def _fallback_summary(self, text: str) -> List[Dict[str, str]]:
-        """Fallback summary when Gemini API fails"""
-        sentences = text.split('.')
-        bullet_points = []
+        # Filter out very short points
+        return point if len(point) > 15 else None
 
-        # Take every 10th sentence or so to create a summary
-        step = max(1, len(sentences) // 8)
-        for i in range(0, min(len(sentences), 40), step):
-            sentence = sentences[i].strip()
-            if sentence and len(sentence) > 20:
-                bullet_points.append({
-                    "point": sentence,
-                    "section": "Summary"
-                })
-                if len(bullet_points) >= 8:
-                    break
-
-        return bullet_points
+    @timed("extractive_summary")
+    def _fallback_summary(self, text: str) -> List[Dict[str, str]]:
+        """Fallback summary when Gemini API fails or is saturated"""
+        return self.extractive_summarizer.summarize(text)
 
+    @timed("clean_text")
     def _clean_text(self, text: str) -> str:
         """Clean and preprocess text"""
-        # Remove extra whitespace and newlines
-        text = re.sub(r'\s+', ' ', text)
-
-        # Remove common transcript artifacts
-        text = re.sub(r'\[.*?\]', '', text)  # Remove [Music], [Applause], etc.
-        text = re.sub(r'\(.*?\)', '', text)  # Remove parenthetical content
+        # Strips caption artifacts and repeated phrases in a single pass
+        return normalize_text(text)
 
-        # Remove repeated phrases (common in auto-generated captions)
-        words = text.split()
-        cleaned_words = []
-        prev_word = ""
-
-        for word in words:
-            if word.lower() != prev_word.lower():
-                cleaned_words.append(word)
-            prev_word = word
-
-        return ' '.join(cleaned_words).strip()
-
-    def _add_timestamps_to_summary(self, bullet_points: List[Dict[str, str]], transcript_with_timestamps: List[Dict]) -> List[Dict[str, str]]:
+    @timed("timestamps")
+    def _add_timestamps_to_summary(self, bullet_points: List[Dict[str, str]], transcript_with_timestamps: List[Dict],
+                                   video_id: Optional[str] = None, index: Optional[TranscriptIndex] = None) -> List[Dict[str, str]]:
         """Add relevant timestamps to summary points"""
+        # Build the inverted index once; each point then only scans its own terms' postings
+        if index is None:
+            index = TranscriptIndex(transcript_with_timestamps)
+
         enhanced_points = []
 
         for point in bullet_points:
-            # Try to find relevant timestamp by matching keywords
-            point_words = set(point['point'].lower().split())
-            best_timestamp = None
-            best_score = 0
-
-            for transcript_entry in transcript_with_timestamps:
-                transcript_words = set(transcript_entry['text'].lower().split())
-                # Calculate word overlap
-                overlap = len(point_words.intersection(transcript_words))
-                if overlap > best_score:
-                    best_score = overlap
-                    best_timestamp = transcript_entry['start_seconds']
+            best_entry = index.best_match(point['point'])
 
             enhanced_point = point.copy()
-            if best_timestamp is not None:
+            if best_entry is not None:
+                best_timestamp = best_entry['start_seconds']
                 enhanced_point['timestamp'] = best_timestamp
                 enhanced_point['timestamp_formatted'] = self._format_timestamp(best_timestamp)
-                enhanced_point['youtube_url'] = f"https://www.youtube.com/watch?v={transcript_with_timestamps[0].get('video_id', '')}&t={int(best_timestamp)}s"
+                if video_id:
+                    enhanced_point['youtube_url'] = f"https://www.youtube.com/watch?v={video_id}&t={int(best_timestamp)}s"
 
             enhanced_points.append(enhanced_point)
 
@@ -0,0 +1,108 @@
+import re
+import sys
+from typing import List
+
+import numpy as np
+
+# [Music], [Applause], (laughs) and other caption artifacts
+ARTIFACT_PATTERN = re.compile(r'\[[^\]]*\]|\([^)]*\)')
+
+DEFAULT_MAX_NGRAM = 8
+
+# Segments are buffered and processed together once this many characters arrive
+BATCH_CHARS = 32 * 1024
+
+
+def _drop_repeats(words: List[str], keys: List[str], max_ngram: int) -> List[str]:
+    """Return words with immediately repeated n-grams collapsed to one copy.
+
+    Keys must be interned, so each word is represented by the id of its key.
+    For each n, ``matches[i]`` is 1 where a word equals the word n places
+    later, so a repeated n-gram is a run of n ones. Comparisons, run search
+    and filtering happen in numpy and C; Python only visits actual repeats.
+    """
+    ids = np.fromiter(map(id, keys), dtype=np.int64, count=len(keys))
+    index = None
+    for n in range(1, max_ngram + 1):
+        if len(ids) < 2 * n:
+            break
+        matches = (ids[:-n] == ids[n:]).tobytes()
+        run = b'\x01' * n
+
+        i = matches.find(run)
+        if i == -1:
+            continue
+
+        keep = bytearray(b'\x01') * len(ids)
+        while i != -1:
+            # Keep the first copy; a third copy shows up as a run starting at i + n
+            keep[i + n:i + 2 * n] = bytes(n)
+            i = matches.find(run, i + n)
+
+        mask = np.frombuffer(keep, dtype=bool)
+        ids = ids[mask]
+        index = mask.nonzero()[0] if index is None else index[mask]
+
+    if index is None:
+        return words
+    return list(map(words.__getitem__, index.tolist()))
+
+
+class TranscriptNormalizer:
+    """Streaming caption cleaner fed one segment at a time.
+
+    Segments are buffered as they arrive and processed in batches: caption
+    artifacts are stripped with one precompiled pattern, whitespace is
+    collapsed and immediately repeated n-grams (up to ``max_ngram`` words)
+    are dropped, including repeats spanning segments as rolling auto-captions
+    produce. Words accumulate in a list that ``text()`` joins once.
+    """
+
+    def __init__(self, max_ngram: int = DEFAULT_MAX_NGRAM):
+        self.max_ngram = max_ngram
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._words: List[str] = []
+
+    def feed(self, segment: str):
+        """Add one caption segment to the running text"""
+        self._pending.append(segment)
+        self._pending_chars += len(segment)
+        if self._pending_chars >= BATCH_CHARS:
+            self._flush()
+
+    def _flush(self):
+        """Clean the buffered segments and drop repeats among the new words"""
+        if not self._pending:
+            return
+        batch = ' '.join(self._pending)
+        self._pending.clear()
+        self._pending_chars = 0
+
+        if '[' in batch or '(' in batch:
+            batch = ARTIFACT_PATTERN.sub(' ', batch)
+
+        # Overlap the words already emitted so repeats across the boundary are caught
+        overlap = min(len(self._words), 2 * self.max_ngram)
+        words = self._words[len(self._words) - overlap:] + batch.split()
+        del self._words[len(self._words) - overlap:]
+
+        keys = ' '.join(words).lower().split()
+        if len(keys) != len(words):
+            # Lowercasing changed how a word splits (rare Unicode cases)
+            keys = [word.lower() for word in words]
+        # Interned keys compare by identity, which is cheaper than string equality
+        keys = list(map(sys.intern, keys))
+        self._words.extend(_drop_repeats(words, keys, self.max_ngram))
+
+    def text(self) -> str:
+        """The normalized transcript so far"""
+        self._flush()
+        return ' '.join(self._words)
+
+
+def normalize_text(text: str, max_ngram: int = DEFAULT_MAX_NGRAM) -> str:
+    """Normalize a whole transcript in one pass"""
+    normalizer = TranscriptNormalizer(max_ngram)
+    normalizer.feed(text)
+    return normalizer.text()
@@ -0,0 +1,75 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves also like really going
+get got gonna um uh yeah okay oh know thing things one
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords and single characters removed"""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+class TranscriptIndex:
+    """BM25 inverted index over transcript segments.
+
+    Built once per transcript; each query only touches the postings of its
+    own terms instead of scanning every segment.
+    """
+
+    def __init__(self, segments: List[Dict], k1: float = 1.2, b: float = 0.75):
+        self.segments = segments
+        self.k1 = k1
+        self.b = b
+
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+
+        for index, segment in enumerate(segments):
+            tokens = tokenize(segment.get('text', ''))
+            self.doc_lengths.append(len(tokens))
+            for token, count in Counter(tokens).items():
+                self.postings[token].append((index, count))
+
+        num_docs = len(segments)
+        self.avg_length = (sum(self.doc_lengths) / num_docs) if num_docs else 0.0
+        self.idf = {
+            token: math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in self.postings.items()
+        }
+
+    def best_match(self, query: str) -> Optional[Dict]:
+        """Return the segment scoring highest for query, or None if no term matches"""
+        scores: Dict[int, float] = defaultdict(float)
+        avg_length = self.avg_length or 1.0
+
+        for token in set(tokenize(query)):
+            docs = self.postings.get(token)
+            if not docs:
+                continue
+            idf = self.idf[token]
+            for index, tf in docs:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[index] / avg_length)
+                scores[index] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if not scores:
+            return None
+
+        # Ties go to the earliest segment
+        best_index = max(scores, key=lambda index: (scores[index], -index))
+        return self.segments[best_index]
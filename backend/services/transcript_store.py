@@ -0,0 +1,45 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from services.cache_service import TwoTierCache
+from services.executors import run_in_pool
+
+
+class TranscriptStore:
+    """Server-side transcripts that clients refer to by ``transcript_id``.
+
+    Each transcript is kept compactly as its normalized text plus parallel
+    arrays of segment start times and segment texts, so endpoints can take a
+    short handle instead of the client re-uploading the whole transcript.
+    """
+
+    def __init__(self):
+        self.cache = TwoTierCache(
+            "transcript_store",
+            max_memory_items=int(os.getenv("TRANSCRIPT_STORE_MEMORY_ITEMS", "128")),
+            max_disk_items=int(os.getenv("TRANSCRIPT_STORE_DISK_ITEMS", "5000")),
+            ttl_seconds=float(os.getenv("TRANSCRIPT_STORE_TTL_SECONDS", str(7 * 24 * 3600))),
+        )
+
+    async def put(self, text: str, starts: List[float], texts: List[str], video_id: Optional[str] = None) -> str:
+        """Store a transcript and return its content-derived id"""
+        # Hashing, JSON encoding and the SQLite commit take milliseconds for long transcripts
+        return await run_in_pool("disk", self._put, text, starts, texts, video_id)
+
+    def _put(self, text: str, starts: List[float], texts: List[str], video_id: Optional[str] = None) -> str:
+        """Store a transcript and return its id (blocking)"""
+        digest = hashlib.sha256(text.encode("utf-8"))
+        digest.update(json.dumps(starts).encode("utf-8"))
+        transcript_id = digest.hexdigest()[:24]
+
+        self.cache.set(transcript_id, {"text": text, "starts": starts, "texts": texts, "video_id": video_id})
+        return transcript_id
+
+    async def get(self, transcript_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored record, or None if it is unknown or expired"""
+        return await self.cache.aget(transcript_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
@@ -1,53 +1,154 @@
 import asyncio
-import google.generativeai as genai
 import os
-from typing import List, Dict
+import re
+from typing import AsyncIterator, List, Dict, Tuple
 from dotenv import load_dotenv
 
+from services.cache_service import TwoTierCache, content_key
+from services.context_selector import estimate_tokens
+from services.llm_gateway import get_llm_gateway
+from services.metrics import FALLBACKS
+from services.single_flight import single_flight, make_key
+
 load_dotenv()
 
+NUMBERED_LINE_PATTERN = re.compile(r'^\[(\d+)\]\s*(.+)$')
+
 class TranslationService:
+    PROMPT_VERSION = "1"
+
     def __init__(self):
-        self.api_key = os.getenv('GEMINI_API_KEY')
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        else:
-            self.model = None
+        self.gateway = get_llm_gateway()
+        self.model_name = self.gateway.model_name
+
+        # Translation memory: one entry per (source point, target language)
+        self.translation_memory = TwoTierCache(
+            "translation_memory",
+            max_memory_items=int(os.getenv("TRANSLATION_MEMORY_MEMORY_ITEMS", "2048")),
+            max_disk_items=int(os.getenv("TRANSLATION_MEMORY_DISK_ITEMS", "50000")),
+            ttl_seconds=float(os.getenv("TRANSLATION_MEMORY_TTL_SECONDS", str(90 * 24 * 3600))),
+        )
+
+        # Shared cap on concurrent Gemini translation calls
+        self._semaphore = asyncio.Semaphore(int(os.getenv("TRANSLATION_MAX_CONCURRENCY", "4")))
+
+        # Points sent per prompt are capped at this many tokens
+        self.context_tokens = int(os.getenv("TRANSLATION_CONTEXT_TOKENS", "1500"))
 
     def _is_configured(self):
         """Check if Gemini API is properly configured"""
-        return self.model is not None
+        return self.gateway.is_configured()
 
     async def translate_summary(self, summary_points: List[Dict[str, str]], target_language: str) -> List[Dict[str, str]]:
         """Translate summary points to target language"""
+        return await single_flight.do(
+            make_key("translate", summary_points, target_language),
+            lambda: self._translate_summary(summary_points, target_language)
+        )
+
+    async def _translate_summary(self, summary_points: List[Dict[str, str]], target_language: str) -> List[Dict[str, str]]:
+        """Translate summary points to target language (uncoalesced)"""
         if not self._is_configured():
             raise Exception("Gemini API key not configured for translation.")
 
-        # Prepare text for translation
-        text_to_translate = "\n".join([f"• {point['point']}" for point in summary_points])
+        # Look every point up in the translation memory first
+        memory_keys = [self._memory_key(point['point'], target_language) for point in summary_points]
+        translations = {}
+        for index, cached in enumerate(await self.translation_memory.aget_many(memory_keys)):
+            if cached is not None:
+                translations[index] = cached
+
+        missing = [index for index in range(len(summary_points)) if index not in translations]
+        if missing:
+            # Long summaries are split so no prompt exceeds the token budget
+            batches = self._batch_points(summary_points, missing)
+            results = await asyncio.gather(*(
+                self._translate_batch(summary_points, batch, target_language) for batch in batches
+            ))
+            learned = {}
+            for batch, parsed in zip(batches, results):
+                for number, translated_text in parsed.items():
+                    index = batch[number - 1]
+                    translations[index] = translated_text
+                    learned[memory_keys[index]] = translated_text
+            if learned:
+                await self.translation_memory.aset_many(learned)
+
+        # Points that could not be translated keep their original text
+        translated_points = []
+        for index, point in enumerate(summary_points):
+            if index in translations:
+                translated_points.append({
+                    **point,
+                    "point": translations[index],
+                    "original_point": point["point"]
+                })
+            else:
+                translated_points.append(point)
+
+        return translated_points
 
-        # Create translation prompt
+    async def _translate_batch(self, summary_points: List[Dict[str, str]], batch: List[int],
+                               target_language: str) -> Dict[int, str]:
+        """Translate the points at the batch indices; {} if Gemini fails"""
+        # Numbered so results merge back by index
+        text_to_translate = "\n".join(
+            f"[{number}] {summary_points[index]['point']}" for number, index in enumerate(batch, 1)
+        )
         prompt = self._create_translation_prompt(text_to_translate, target_language)
 
         try:
             # Generate translation using Gemini
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                self.model.generate_content,
-                prompt
-            )
+            async with self._semaphore:
+                response_text = await self.gateway.generate(prompt, service="translation")
 
             # Parse the translated response
-            translated_points = self._parse_translation_response(response.text, summary_points)
-
-            return translated_points
+            return self._parse_translation_response(response_text, len(batch))
 
         except Exception as e:
             print(f"Error with translation: {e}")
-            # Return original if translation fails
-            return summary_points
+            FALLBACKS.labels("translation", "error").inc()
+            return {}
+
+    def _batch_points(self, summary_points: List[Dict[str, str]], indices: List[int]) -> List[List[int]]:
+        """Group consecutive point indices so each group fits the context token budget"""
+        batches = []
+        current = []
+        current_tokens = 0
+        for index in indices:
+            tokens = estimate_tokens(summary_points[index]['point'])
+            if current and current_tokens + tokens > self.context_tokens:
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(index)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+
+        return batches
+
+    async def translate_summary_multi(self, summary_points: List[Dict[str, str]],
+                                      target_languages: List[str]) -> AsyncIterator[Tuple[str, List[Dict[str, str]]]]:
+        """Translate summary points into several languages concurrently.
+
+        Yields ``(language, translated_points)`` pairs in completion order.
+        """
+        async def translate(language: str) -> Tuple[str, List[Dict[str, str]]]:
+            return language, await self.translate_summary(summary_points, language)
+
+        # Deduplicate while keeping the requested order
+        languages = list(dict.fromkeys(target_languages))
+        for next_done in asyncio.as_completed([translate(language) for language in languages]):
+            yield await next_done
+
+    def _memory_key(self, point_text: str, target_language: str) -> str:
+        """Translation memory key for one source point"""
+        return content_key(
+            self.model_name, self.PROMPT_VERSION, ' '.join(point_text.split()),
+            target_language=target_language.strip().lower()
+        )
 
     def _create_translation_prompt(self, text: str, target_language: str) -> str:
         """Create a prompt for Gemini to translate the summary"""
@@ -68,7 +169,8 @@ Original text:
 {text}
 
 Requirements:
-- Keep the bullet point format (•)
+- Keep the numbered markers ([1], [2], ...) at the start of each line
+- Translate each line on its own line
 - Maintain the same number of points
 - Preserve the meaning and context
 - Use natural, fluent {target_language}
@@ -77,33 +179,32 @@ Requirements:
 Translated text:
 """
 
-    def _parse_translation_response(self, response_text: str, original_points: List[Dict[str, str]]) -> List[Dict[str, str]]:
-        """Parse the translated response back into structured format"""
-        translated_points = []
-        lines = response_text.strip().split('\n')
+    def _parse_translation_response(self, response_text: str, num_points: int) -> Dict[int, str]:
+        """Parse the translated response into {point number: translated text}"""
+        numbered = {}
+        bullets = []
 
-        point_index = 0
-        for line in lines:
+        for line in response_text.strip().split('\n'):
             line = line.strip()
             if not line:
                 continue
 
-            # Check if it's a bullet point
-            if line.startswith('•') or line.startswith('-') or line.startswith('*'):
+            match = NUMBERED_LINE_PATTERN.match(line)
+            if match:
+                number = int(match.group(1))
+                translated_text = match.group(2).strip()
+                if 1 <= number <= num_points and translated_text:
+                    numbered[number] = translated_text
+            elif line.startswith('•') or line.startswith('-') or line.startswith('*'):
                 translated_text = line[1:].strip()
-                if translated_text and point_index < len(original_points):
-                    translated_points.append({
-                        "point": translated_text,
-                        "section": original_points[point_index]["section"],
-                        "original_point": original_points[point_index]["point"]
-                    })
-                    point_index += 1
-
-        # If parsing failed, return original with translation attempt
-        if len(translated_points) != len(original_points):
-            return original_points
+                if translated_text:
+                    bullets.append(translated_text)
 
-        return translated_points
+        # Bulleted output without markers can only be trusted if the count matches
+        if not numbered and len(bullets) == num_points:
+            return {number: text for number, text in enumerate(bullets, 1)}
+
+        return numbered
 
     def get_supported_languages(self) -> Dict[str, str]:
         """Get list of supported languages"""
@@ -1,12 +1,37 @@
 import re
-import requests
 from youtube_transcript_api import YouTubeTranscriptApi
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import asyncio
+import os
+import time
+
+from services.cache_service import TwoTierCache
+from services.executors import run_in_pool
+from services.http_client import get_http_client
+from services.metrics import TRANSCRIPT_FETCH_SECONDS
+from services.request_timing import timed
+from services.single_flight import single_flight, make_key
+from services.text_normalizer import normalize_text
+from services.transcript_store import TranscriptStore
+
+VIDEO_ID_PATTERN = re.compile(r'"videoId":"([\w-]{11})"')
 
 class YouTubeService:
     def __init__(self):
-        self.api_key = None  # Optional: Add YouTube Data API key for enhanced features
+        # Optional: YouTube Data API key, used to page through long playlists
+        self.api_key = os.getenv("YOUTUBE_API_KEY") or None
+        self.max_collection_videos = int(os.getenv("PLAYLIST_MAX_VIDEOS", "500"))
+
+        # Transcripts are kept server-side and handed out by id
+        self.transcript_store = TranscriptStore()
+
+        # Transcripts rarely change, so keep popular ones off the network (video_id -> transcript_id)
+        self.transcript_cache = TwoTierCache(
+            "transcript_ids",
+            max_memory_items=int(os.getenv("TRANSCRIPT_CACHE_MEMORY_ITEMS", "128")),
+            max_disk_items=int(os.getenv("TRANSCRIPT_CACHE_DISK_ITEMS", "5000")),
+            ttl_seconds=float(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        )
 
     def extract_video_id(self, url: str) -> str:
         """Extract video ID from YouTube URL"""
@@ -22,36 +47,129 @@ class YouTubeService:
 
         raise ValueError("Invalid YouTube URL")
 
+    def extract_playlist_id(self, url: str) -> Optional[str]:
+        """Extract playlist ID from a playlist or watch URL, if it has one"""
+        match = re.search(r'[?&]list=([\w-]+)', url)
+        return match.group(1) if match else None
+
+    async def get_collection_video_ids(self, url: str) -> List[str]:
+        """Video IDs of a playlist or channel URL, or of a single video URL"""
+        playlist_id = self.extract_playlist_id(url)
+        channel_match = re.search(r'youtube\.com\/channel\/(UC[\w-]+)', url)
+        if not playlist_id and channel_match:
+            # A channel's uploads playlist shares its ID after the "UC" prefix
+            playlist_id = "UU" + channel_match.group(1)[2:]
+
+        if playlist_id:
+            if self.api_key:
+                return await self._get_playlist_video_ids_api(playlist_id)
+            return await self._scrape_video_ids(f"https://www.youtube.com/playlist?list={playlist_id}")
+
+        handle_match = re.search(r'(youtube\.com\/(?:@[\w.-]+|c\/[\w.-]+|user\/[\w.-]+))', url)
+        if handle_match:
+            return await self._scrape_video_ids(f"https://www.{handle_match.group(1)}/videos")
+
+        return [self.extract_video_id(url)]
+
+    async def _get_playlist_video_ids_api(self, playlist_id: str) -> List[str]:
+        """Page through a playlist with the YouTube Data API"""
+        video_ids = []
+        page_token = None
+        while len(video_ids) < self.max_collection_videos:
+            params = {
+                "part": "contentDetails",
+                "playlistId": playlist_id,
+                "maxResults": 50,
+                "key": self.api_key,
+            }
+            if page_token:
+                params["pageToken"] = page_token
+            response = await get_http_client().get("https://www.googleapis.com/youtube/v3/playlistItems", params=params)
+            response.raise_for_status()
+            data = response.json()
+
+            video_ids.extend(item["contentDetails"]["videoId"] for item in data.get("items", []))
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                break
+        return video_ids[:self.max_collection_videos]
+
+    async def _scrape_video_ids(self, page_url: str) -> List[str]:
+        """Video IDs listed on a playlist or channel page (first page only, no API key needed)"""
+        response = await get_http_client().get(page_url, headers={"Accept-Language": "en"})
+        response.raise_for_status()
+
+        # dict keeps first-seen order while dropping repeats
+        video_ids = dict.fromkeys(VIDEO_ID_PATTERN.findall(response.text))
+        if not video_ids:
+            raise ValueError("No videos found at this URL")
+        return list(video_ids)[:self.max_collection_videos]
+
     async def get_video_info(self, url: str) -> Dict:
         """Get video information and transcript"""
         try:
             video_id = self.extract_video_id(url)
 
-            # Get video metadata using oembed (no API key required)
-            metadata = await self._get_video_metadata(video_id)
-
-            # Get transcript
-            transcript_data = await self._get_transcript(video_id)
-
-            return {
-                "video_id": video_id,
-                "title": metadata.get("title", "Unknown Title"),
-                "author_name": metadata.get("author_name", "Unknown Channel"),
-                "thumbnail_url": metadata.get("thumbnail_url", ""),
-                "transcript": transcript_data["text"],
-                "transcript_with_timestamps": transcript_data["with_timestamps"]
-            }
+            # Students opening the same shared video share one fetch
+            return await single_flight.do(
+                make_key("video_info", video_id),
+                lambda: self._build_video_info(video_id)
+            )
 
         except Exception as e:
             raise Exception(f"Failed to fetch video information: {str(e)}")
 
+    async def _build_video_info(self, video_id: str) -> Dict:
+        """Fetch metadata and transcript for a video"""
+        # Fetch metadata (oembed, no API key required) and transcript concurrently
+        metadata, (transcript_id, transcript_data) = await asyncio.gather(
+            self._get_video_metadata(video_id),
+            self._get_transcript(video_id)
+        )
+
+        return {
+            "video_id": video_id,
+            "transcript_id": transcript_id,
+            "title": metadata.get("title", "Unknown Title"),
+            "author_name": metadata.get("author_name", "Unknown Channel"),
+            "thumbnail_url": metadata.get("thumbnail_url", ""),
+            "segment_count": len(transcript_data["starts"]),
+            "transcript": transcript_data["text"],
+            "transcript_with_timestamps": self._with_timestamps(transcript_data)
+        }
+
+    async def resolve_transcript(self, transcript_id: Optional[str] = None, video_id: Optional[str] = None) -> Dict:
+        """Look up a stored transcript by id, fetching it by video_id if needed"""
+        transcript_data = await self.transcript_store.get(transcript_id) if transcript_id else None
+        if transcript_data is None and video_id:
+            transcript_id, transcript_data = await single_flight.do(
+                make_key("transcript", video_id),
+                lambda: self._get_transcript(video_id)
+            )
+        if transcript_data is None:
+            raise LookupError("Transcript not found. Send the transcript text or a video_id.")
+
+        return {
+            "transcript_id": transcript_id,
+            "video_id": transcript_data.get("video_id") or video_id,
+            "text": transcript_data["text"],
+            "with_timestamps": self._with_timestamps(transcript_data)
+        }
+
+    def _with_timestamps(self, transcript_data: Dict) -> List[Dict]:
+        """Expand the stored parallel arrays into timestamped segments"""
+        return [
+            {"timestamp": self._format_timestamp(start), "text": text, "start_seconds": start}
+            for start, text in zip(transcript_data["starts"], transcript_data["texts"])
+        ]
+
     async def _get_video_metadata(self, video_id: str) -> Dict:
         """Get video metadata using YouTube oEmbed API"""
         try:
-            oembed_url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(None, requests.get, oembed_url)
+            response = await get_http_client().get(
+                "https://www.youtube.com/oembed",
+                params={"url": f"https://www.youtube.com/watch?v={video_id}", "format": "json"}
+            )
             response.raise_for_status()
 
             return response.json()
@@ -62,41 +180,63 @@ class YouTubeService:
                 "thumbnail_url": f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
             }
 
-    async def _get_transcript(self, video_id: str) -> Dict:
-        """Get video transcript with timestamps"""
+    def get_cache_stats(self) -> Dict:
+        """Get hit/miss counters for the transcript cache"""
+        return self.transcript_cache.stats()
+
+    def get_store_stats(self) -> Dict:
+        """Get hit/miss counters for the transcript store"""
+        return self.transcript_store.stats()
+
+    async def _get_transcript(self, video_id: str) -> Tuple[str, Dict]:
+        """Get (transcript_id, stored transcript), served from the store when possible"""
+        transcript_id = await self.transcript_cache.aget(video_id)
+        transcript_data = await self.transcript_store.get(transcript_id) if transcript_id else None
+        if transcript_data is not None:
+            return transcript_id, transcript_data
+
+        transcript_data = await self._fetch_transcript(video_id)
+        transcript_id = await self.transcript_store.put(
+            transcript_data["text"], transcript_data["starts"], transcript_data["texts"], video_id
+        )
+        await self.transcript_cache.aset(video_id, transcript_id)
+        return transcript_id, {**transcript_data, "video_id": video_id}
+
+    @timed("transcript_fetch")
+    async def _fetch_transcript(self, video_id: str) -> Dict:
+        """Fetch video transcript with timestamps from YouTube"""
+        start = time.monotonic()
         try:
             # Create API instance and use fetch method
             def get_transcript_sync():
                 api = YouTubeTranscriptApi()
                 return api.fetch(video_id)
 
-            loop = asyncio.get_event_loop()
-            transcript_list = await loop.run_in_executor(None, get_transcript_sync)
-
-            # Format transcript
-            full_text = ""
-            formatted_transcript = []
-
-            for entry in transcript_list:
-                # Access attributes directly from FetchedTranscriptSnippet object
-                timestamp = self._format_timestamp(entry.start)
-                text = entry.text.strip()
-
-                full_text += f"{text} "
-                formatted_transcript.append({
-                    "timestamp": timestamp,
-                    "text": text,
-                    "start_seconds": entry.start
-                })
-
-            return {
-                "text": full_text.strip(),
-                "with_timestamps": formatted_transcript
-            }
+            transcript_list = await run_in_pool("network", get_transcript_sync)
+            # Long transcripts take tens of milliseconds to normalize, so keep it off the event loop
+            transcript_data = await run_in_pool("cpu", self._assemble_transcript, transcript_list)
+            TRANSCRIPT_FETCH_SECONDS.labels("ok").observe(time.monotonic() - start)
+            return transcript_data
 
         except Exception as e:
+            TRANSCRIPT_FETCH_SECONDS.labels("error").observe(time.monotonic() - start)
             raise Exception(f"Failed to fetch transcript: {str(e)}. The video might not have captions available.")
 
+    def _assemble_transcript(self, transcript_list) -> Dict:
+        """Normalized full text plus parallel start/text arrays for the fetched captions (blocking)"""
+        starts = []
+        texts = []
+        for entry in transcript_list:
+            # Access attributes directly from FetchedTranscriptSnippet object
+            starts.append(entry.start)
+            texts.append(entry.text.strip())
+
+        return {
+            "text": normalize_text(' '.join(texts)),
+            "starts": starts,
+            "texts": texts
+        }
+
     def _format_timestamp(self, seconds: float) -> str:
         """Convert seconds to MM:SS or HH:MM:SS format"""
         hours = int(seconds // 3600)
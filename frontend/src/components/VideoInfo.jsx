@@ -41,7 +41,7 @@ const VideoInfo = () => {
           <div className="flex items-center text-gray-600 dark:text-gray-400">
             <Clock className="w-4 h-4 mr-2" />
             <span>
-              {videoInfo.transcript_with_timestamps?.length || 0} transcript segments
+              {videoInfo.segment_count ?? videoInfo.transcript_with_timestamps?.length ?? 0} transcript segments
             </span>
           </div>
         </div>
@@ -35,9 +35,9 @@ export const VideoProvider = ({ children }) => {
 
       // Step 2: Generate summary with timestamps
       const summaryResult = await videoService.generateSummary(
-        info.transcript,
+        info.transcript_id,
         info.title,
-        info.transcript_with_timestamps
+        info.video_id
       )
       setSummary(summaryResult.summary)
 
@@ -93,14 +93,16 @@ export const VideoProvider = ({ children }) => {
       setLoading(true)
       if (type === 'flashcards') {
         const result = await videoService.generateFlashcards(
-          videoInfo.transcript,
+          videoInfo.transcript_id,
+          videoInfo.video_id,
           videoInfo.title,
           numItems
         )
         setFlashcards(result.flashcards)
       } else if (type === 'quiz') {
         const result = await videoService.generateQuiz(
-          videoInfo.transcript,
+          videoInfo.transcript_id,
+          videoInfo.video_id,
           videoInfo.title,
           numItems
         )
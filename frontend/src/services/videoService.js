@@ -10,7 +10,11 @@ const api = axios.create({
 export const videoService = {
   async getVideoInfo(url) {
     try {
-      const response = await api.post('/api/video/info', { url })
+      // The transcript stays on the server; only ask for what the UI shows
+      const response = await api.post('/api/video/info', {
+        url,
+        fields: ['video_id', 'transcript_id', 'title', 'author_name', 'thumbnail_url', 'segment_count']
+      })
       return response.data
     } catch (error) {
       throw new Error(
@@ -20,12 +24,13 @@ export const videoService = {
     }
   },
 
-  async generateSummary(transcript, videoTitle, transcriptWithTimestamps = null) {
+  async generateSummary(transcriptId, videoTitle, videoId = null) {
     try {
+      // The backend keeps the transcript; send its handle instead of the text
       const response = await api.post('/api/summarize', {
-        transcript,
+        transcript_id: transcriptId,
         video_title: videoTitle,
-        transcript_with_timestamps: transcriptWithTimestamps
+        video_id: videoId
       })
       return response.data
     } catch (error) {
@@ -63,10 +68,11 @@ export const videoService = {
     }
   },
 
-  async generateFlashcards(transcript, videoTitle, numCards = 10) {
+  async generateFlashcards(transcriptId, videoId, videoTitle, numCards = 10) {
     try {
       const response = await api.post('/api/study/flashcards', {
-        transcript,
+        transcript_id: transcriptId,
+        video_id: videoId,
         video_title: videoTitle,
         num_items: numCards
       })
@@ -79,10 +85,11 @@ export const videoService = {
     }
   },
 
-  async generateQuiz(transcript, videoTitle, numQuestions = 5) {
+  async generateQuiz(transcriptId, videoId, videoTitle, numQuestions = 5) {
     try {
       const response = await api.post('/api/study/quiz', {
-        transcript,
+        transcript_id: transcriptId,
+        video_id: videoId,
         video_title: videoTitle,
         num_items: numQuestions
       })